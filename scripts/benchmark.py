@@ -0,0 +1,308 @@
+"""
+Benchmark the processing stages of AutoFolder VideoMixer on synthetic media.
+
+    python scripts/benchmark.py run [--scenario NAME ...] [--repeat N] [-o report.json]
+    python scripts/benchmark.py compare BASE.json NEW.json [--threshold 1.2]
+
+Fixtures are generated with the FFmpeg lavfi test sources (no media needs to be
+checked in) and kept in the work folder, so later runs and other commits time
+exactly the same files. Every stage runs with empty probe/clip caches unless
+its name ends in "_warm".
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import AutoFolder as af  # noqa: E402
+
+REPORT_VERSION = 1
+# Distinct template files per kind, copies of them make up the large folders
+TEMPLATE_VARIANTS = 8
+DEFAULT_WORK_DIR = os.path.join(tempfile.gettempdir(), "autofolder-bench")
+
+# videos/images: file counts, seconds: video length, size/fps: video format,
+# image_size: photo resolution, minutes: also time fixed length mode,
+# stages: limit to these stages (large folders only list and probe)
+SCENARIOS = {
+    "mixed-10": dict(videos=6, images=4, seconds=2, size="640x360", fps=25,
+                     image_size="1600x1200"),
+    "images-500": dict(videos=0, images=500, seconds=0, size="640x360", fps=25,
+                       image_size="1920x1080"),
+    "videos-100": dict(videos=100, images=0, seconds=3, size="960x540", fps=25,
+                       image_size="1600x1200"),
+    "fixed-length-50": dict(videos=30, images=20, seconds=2, size="640x360", fps=25,
+                            image_size="1600x1200", minutes=0.5),
+    "listing-5000": dict(videos=2500, images=2500, seconds=1, size="320x240", fps=25,
+                         image_size="640x480", stages=["list", "estimate_cold", "estimate_warm"]),
+}
+
+STAGES = ["list", "estimate_cold", "estimate_warm", "build_clips_cold",
+          "build_clips_warm", "final_concat", "build_clips_fixed"]
+
+
+# ================= FIXTURES =================
+
+def ffmpeg(args):
+    subprocess.run([af.get_ffmpeg()[0], "-v", "error", "-y", *args], check=True)
+
+
+def make_video(path, seconds, size, fps, variant):
+    ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate={fps}:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency={220 + 55 * variant}:duration={seconds}",
+        "-vf", f"hue=h={variant * 45}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest",
+        path
+    ])
+
+
+def make_image(path, size, variant):
+    ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size={size}:rate=1",
+        "-vf", f"hue=h={variant * 45}",
+        "-frames:v", "1", "-q:v", "3",
+        path
+    ])
+
+
+def fixture_folder(work_dir, name, spec, seed):
+    """Create (once) the media folder of a scenario and return its path"""
+    ident = {k: spec[k] for k in ("videos", "images", "seconds", "size", "fps", "image_size")}
+    folder = os.path.join(work_dir, name)
+    marker = os.path.join(folder, ".fixture.json")
+    try:
+        with open(marker, encoding="utf-8") as f:
+            if json.load(f) == {"spec": ident, "seed": seed}:
+                return folder
+    except Exception:
+        pass
+
+    shutil.rmtree(folder, ignore_errors=True)
+    templates = os.path.join(work_dir, "_templates")
+    os.makedirs(templates, exist_ok=True)
+    os.makedirs(folder)
+
+    def template(kind, variant):
+        if kind == "video":
+            path = os.path.join(templates, f"v_{spec['size']}_{spec['fps']}_{spec['seconds']}_{variant}.mp4")
+            if not os.path.exists(path):
+                make_video(path, spec["seconds"], spec["size"], spec["fps"], variant)
+        else:
+            path = os.path.join(templates, f"i_{spec['image_size']}_{variant}.jpg")
+            if not os.path.exists(path):
+                make_image(path, spec["image_size"], variant)
+        return path
+
+    # Deterministic mix of videos and images, with increasing modification times
+    kinds = ["video"] * spec["videos"] + ["image"] * spec["images"]
+    random.Random(seed).shuffle(kinds)
+    base = 1_600_000_000
+    for i, kind in enumerate(kinds):
+        ext = ".mp4" if kind == "video" else ".jpg"
+        path = os.path.join(folder, f"{i:05d}{ext}")
+        shutil.copyfile(template(kind, i % TEMPLATE_VARIANTS), path)
+        os.utime(path, (base + i, base + i))
+
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump({"spec": ident, "seed": seed}, f)
+    return folder
+
+
+# ================= STAGES =================
+
+def reset_probe_cache(temp_dir):
+    af.PROBE_CACHE_FILE = os.path.join(temp_dir, "probe_cache.json")
+    af._probe_cache = None
+    af._probe_cache_dirty = False
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run_scenario(folder, spec, workers, image_duration):
+    """Time every stage of one scenario once, returns {stage: {...}}"""
+    stages = spec.get("stages") or [
+        s for s in STAGES if s != "build_clips_fixed" or spec.get("minutes")
+    ]
+    noop = lambda *_: None  # noqa: E731
+    results = {}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        reset_probe_cache(temp_dir)
+        cache_dir = os.path.join(temp_dir, "clips")
+        clip_dir = os.path.join(temp_dir, "work")
+        os.makedirs(clip_dir)
+
+        seconds, files = timed(lambda: af.list_media_files(folder, af.ORDER_NAME))
+        results["list"] = {"seconds": seconds, "files": len(files)}
+
+        if "estimate_cold" in stages:
+            seconds, total = timed(lambda: af.estimate_total_duration(files, image_duration, workers))
+            results["estimate_cold"] = {"seconds": seconds, "media_seconds": round(total, 3)}
+        if "estimate_warm" in stages:
+            seconds, _ = timed(lambda: af.estimate_total_duration(files, image_duration, workers))
+            results["estimate_warm"] = {"seconds": seconds}
+
+        clips = []
+        if "build_clips_cold" in stages:
+            errors, stats = [], {}
+            seconds, clips = timed(lambda: af.build_clips(
+                files, clip_dir, image_duration, noop, workers, errors, cache_dir, stats))
+            results["build_clips_cold"] = {"seconds": seconds, "clips": len(clips),
+                                           "errors": len(errors), "stats": stats}
+        if "build_clips_warm" in stages:
+            stats = {}
+            seconds, clips = timed(lambda: af.build_clips(
+                files, clip_dir, image_duration, noop, workers, [], cache_dir, stats))
+            results["build_clips_warm"] = {"seconds": seconds, "stats": stats}
+
+        if "final_concat" in stages and clips:
+            list_file = os.path.join(temp_dir, "list.txt")
+            output = os.path.join(temp_dir, "combined.mp4")
+            af.write_concat_list(clips, list_file)
+            seconds, method = timed(lambda: af.final_concat(list_file, output, clips,
+                                                              workers=workers))
+            results["final_concat"] = {"seconds": seconds, "method": method,
+                                       "bytes": os.path.getsize(output)}
+
+        if "build_clips_fixed" in stages:
+            fixed_cache = os.path.join(temp_dir, "clips_fixed")
+            stats = {}
+            seconds, fixed = timed(lambda: af.build_clips_fixed(
+                files, clip_dir, spec["minutes"], image_duration, noop, workers, [],
+                fixed_cache, stats))
+            results["build_clips_fixed"] = {
+                "seconds": seconds, "clips": len(fixed), "stats": stats,
+                "media_seconds": round(sum(dur for _, dur in fixed), 3),
+            }
+
+        af.reset_cancel()
+    return results
+
+
+def environment():
+    def output(args):
+        try:
+            return subprocess.run(args, capture_output=True, text=True,
+                                  check=True).stdout.splitlines()[0].strip()
+        except Exception:
+            return None
+
+    return {
+        "commit": output(["git", "-C", os.path.dirname(os.path.abspath(__file__)),
+                          "rev-parse", "HEAD"]),
+        "version": af.__version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "ffmpeg": output([af.get_ffmpeg()[0], "-version"]),
+    }
+
+
+def cmd_run(args):
+    if not all(af.get_ffmpeg()):
+        print("FFmpeg and FFprobe not found", file=sys.stderr)
+        return 4
+
+    names = args.scenario or list(SCENARIOS)
+    report = {
+        "report_version": REPORT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "settings": {"workers": args.jobs, "repeat": args.repeat, "seed": args.seed,
+                     "image_duration": args.image_duration},
+        "scenarios": {},
+    }
+
+    for name in names:
+        spec = SCENARIOS[name]
+        print(f"[{name}] preparing fixtures...", file=sys.stderr, flush=True)
+        folder = fixture_folder(args.work_dir, name, spec, args.seed)
+
+        runs = []
+        for i in range(args.repeat):
+            print(f"[{name}] run {i + 1}/{args.repeat}", file=sys.stderr, flush=True)
+            runs.append(run_scenario(folder, spec, args.jobs, args.image_duration))
+
+        # The fastest run is the least disturbed by the rest of the machine
+        stages = {}
+        for stage in runs[0]:
+            times = [run[stage]["seconds"] for run in runs]
+            stages[stage] = dict(runs[0][stage], seconds=round(min(times), 4),
+                                 runs=[round(t, 4) for t in times])
+        report["scenarios"][name] = {"spec": spec, "stages": stages}
+
+        for stage, result in stages.items():
+            print(f"  {stage:<18} {result['seconds']:>9.3f} s", file=sys.stderr)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(args.output)
+    return 0
+
+
+def cmd_compare(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    regressions = 0
+    print(f"{'scenario/stage':<40} {'base':>9} {'new':>9} {'ratio':>7}")
+    for name, scenario in new["scenarios"].items():
+        old_stages = base["scenarios"].get(name, {}).get("stages", {})
+        for stage, result in scenario["stages"].items():
+            if stage not in old_stages:
+                continue
+            old, cur = old_stages[stage]["seconds"], result["seconds"]
+            ratio = cur / old if old > 0 else float("inf")
+            # Sub 50 ms stages are too noisy to call a regression
+            slower = ratio > args.threshold and cur - old > 0.05
+            regressions += slower
+            print(f"{name + '/' + stage:<40} {old:>9.3f} {cur:>9.3f} {ratio:>6.2f}x"
+                  + ("  SLOWER" if slower else ""))
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AutoFolder VideoMixer stages")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="time the scenarios and write a JSON report")
+    p.add_argument("--scenario", action="append", choices=SCENARIOS,
+                   help="scenario to run (repeatable, default: all)")
+    p.add_argument("--repeat", type=af.positive_int, default=1,
+                   help="runs per scenario, the fastest is reported (default: 1)")
+    p.add_argument("-j", "--jobs", type=af.positive_int, default=af.DEFAULT_WORKERS)
+    p.add_argument("--image-duration", type=af.positive_float, default=af.DEFAULT_IMAGE_DURATION)
+    p.add_argument("--seed", type=int, default=1, help="order of videos and images")
+    p.add_argument("--work-dir", default=DEFAULT_WORK_DIR,
+                   help=f"where fixtures are kept (default: {DEFAULT_WORK_DIR})")
+    p.add_argument("-o", "--output", default="benchmark.json")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("compare", help="compare two reports, exit code 1 on a regression")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=af.positive_float, default=1.2,
+                   help="slowdown ratio reported as a regression (default: 1.2)")
+    p.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,21 @@ import subprocess
 import time
 import tempfile
 import random
-import tkinter as tk
-from tkinter import messagebox, ttk, filedialog
-from send2trash import send2trash
-import webbrowser
+import json
+import hashlib
+import shutil
+import fnmatch
+import stat
+import threading
+import struct
+import queue
+import signal
+import socket
+import sqlite3
+from contextlib import closing, contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# tkinter, webbrowser and send2trash are imported on first use (see load_gui)
+# so the command line interface starts without loading the GUI toolkit
 
 __version__ = "1.1.0"
 
@@ -26,6 +37,15 @@ def get_resource_path(relative_path):
 DEFAULT_INPUT_FOLDER  = os.path.join(os.path.expanduser("~"), "Videos")
 DEFAULT_OUTPUT_FOLDER = os.path.join(os.path.expanduser("~"), "Videos", "AutoFolder_Output")
 
+def get_app_data_dir():
+    """Per-user folder for caches that survive between runs"""
+    base = (
+        os.environ.get("LOCALAPPDATA")
+        or os.environ.get("XDG_CACHE_HOME")
+        or os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(base, "AutoFolder-VideoMixer")
+
 # Try to find FFmpeg in common locations
 def find_ffmpeg():
     """Attempt to locate FFmpeg executable"""
@@ -67,175 +87,3406 @@ def find_ffmpeg():
     
     return None, None
 
-FFMPEG_PATH, FFPROBE_PATH = find_ffmpeg()
-# ================================================
+# Resolved on first use by get_ffmpeg(), not at import time
+FFMPEG_PATH, FFPROBE_PATH = None, None
+
+
+def get_ffmpeg():
+    """(ffmpeg, ffprobe) paths, located on the first call"""
+    global FFMPEG_PATH, FFPROBE_PATH
+    if not FFMPEG_PATH or not FFPROBE_PATH:
+        FFMPEG_PATH, FFPROBE_PATH = find_ffmpeg()
+    return FFMPEG_PATH, FFPROBE_PATH
+# ================================================
+
+# ================= SETTINGS ======================
+DEFAULT_IMAGE_DURATION = 1.5
+TARGET_W = 1280
+TARGET_H = 720
+TARGET_FPS = "30"
+# Output sizes that can be rendered together, see render_files()
+RENDITIONS = {
+    "1080p": (1920, 1080),
+    "720p": (1280, 720),
+    "480p": (854, 480),
+}
+AUTO_CHECK_INTERVAL_MS = 3000
+# With native change notifications the folder is only rescanned after an event
+WATCH_TICK_MS = 500
+# Files must keep the same size and modification time this long before a combine
+WATCH_SETTLE_SECONDS = 2.0
+# Number of media files normalized at the same time
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# Normalized clips are kept here and reused by later runs (None disables)
+CLIP_CACHE_DIR = os.path.join(get_app_data_dir(), "clips")
+CLIP_CACHE_MAX_BYTES = 20 * 1024 ** 3
+# Clips used this recently are never evicted, another run may still need them
+CLIP_CACHE_GRACE_SECONDS = 6 * 60 * 60
+# Inputs per FFmpeg process in the single pass engine (open files / command line)
+DIRECT_CHUNK_SIZE = 48
+# Consecutive images are encoded together as one slideshow clip of at most this many
+SLIDESHOW_MAX_IMAGES = DIRECT_CHUNK_SIZE
+# A final video that has to be re-encoded is split in parallel chunks of at least this many seconds
+FINAL_CHUNK_MIN_SECONDS = 60
+# ================================================
+
+VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def aspect_safe_filter(size=None):
+    """Fit into `size` (w, h), TARGET_W x TARGET_H by default, padding the rest"""
+    w, h = size or (TARGET_W, TARGET_H)
+    return (
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2"
+    )
+
+
+ASPECT_SAFE_FILTER = aspect_safe_filter()
+
+
+def still_image_filter(duration, size=None, fps=TARGET_FPS):
+    """Scale an image once and repeat the frame for `duration` seconds"""
+    frames = max(1, round(float(duration) * float(fps)))
+    return (
+        f"{aspect_safe_filter(size)},setsar=1,format=yuv420p,"
+        f"loop=loop={frames - 1}:size=1:start=0,setpts=N/{fps}/TB"
+    )
+
+# Every H.264 encode gets the same colour description, so clips made from
+# photos and from videos share identical stream headers and join by stream copy
+H264_HEADER_ARGS = [
+    "-bsf:v",
+    "h264_metadata=video_full_range_flag=0:colour_primaries=2:transfer_characteristics=2"
+    ":matrix_coefficients=2:chroma_sample_loc_type=0",
+]
+# Still image tuning without the psychovisual change of `-tune stillimage`,
+# which would give image clips different stream headers
+STILL_IMAGE_ARGS = ["-x264-params", "aq-strength=1.2:deblock=-3,-3"]
+
+PROFILE_DRAFT = "Draft (fastest)"
+PROFILE_BALANCED = "Balanced"
+PROFILE_ARCHIVE = "Archive (best quality)"
+# Only used by render_preview()
+PROFILE_PREVIEW = "Preview"
+
+# x264 (preset, CRF) of each encode profile; Balanced is the x264 default
+ENCODE_PROFILES = {
+    PROFILE_DRAFT: ("veryfast", 26),
+    PROFILE_BALANCED: ("medium", 23),
+    PROFILE_ARCHIVE: ("slow", 18),
+    PROFILE_PREVIEW: ("ultrafast", 30),
+}
+# Frame rate of the profiles that do not render at TARGET_FPS
+PROFILE_FPS = {
+    PROFILE_PREVIEW: "10",
+}
+
+
+def profile_fps(profile=PROFILE_BALANCED):
+    return PROFILE_FPS.get(profile, TARGET_FPS)
+
+
+# Cores this process may keep busy, None for all of them (`--cores`)
+_cpu_budget = None
+
+
+def cpu_cores():
+    """Cores shared by the FFmpeg processes of this process"""
+    return _cpu_budget or os.cpu_count() or 1
+
+
+def schedule_threads(concurrent_jobs):
+    """Threads per FFmpeg process so that `concurrent_jobs` processes share the cores"""
+    cores = cpu_cores()
+    jobs = max(1, int(concurrent_jobs))
+    # Round up: a core left idle costs more than a little oversubscription
+    return max(1, -(-cores // jobs))
+
+
+def x264_args(profile=PROFILE_BALANCED, threads=0):
+    """Video encoder arguments of an encode profile, threads=0 lets FFmpeg decide"""
+    preset, crf = ENCODE_PROFILES[profile]
+    args = ["-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
+    if threads:
+        args += ["-threads", str(threads)]
+    return args + ["-pix_fmt", "yuv420p", *H264_HEADER_ARGS]
+
+ORDER_NAME = "Sort by name"
+ORDER_DATE_NEW = "Sort by date (newest first)"
+ORDER_DATE_OLD = "Sort by date (oldest first)"
+ORDER_RANDOM = "Random"
+
+ENGINE_CLIPS = "Per-file clips (cached)"
+ENGINE_DIRECT = "Single pass (no temp clips)"
+
+# What to do with files whose content repeats an earlier file, see find_duplicates()
+DUPLICATES_KEEP = "Keep (encode once)"
+DUPLICATES_DROP = "Drop repeats"
+
+
+# ================= MEDIA INDEX =================
+
+def split_patterns(text):
+    """'*.mov; raw/*' -> ['*.mov', 'raw/*']"""
+    return [p.strip() for p in text.replace(",", ";").split(";") if p.strip()]
+
+
+class MediaIndex:
+    """
+    Media files under a folder with their (size, mtime) from one os.scandir
+    pass, so listing, ordering and change detection share a single snapshot.
+    `recursive` includes subfolders (hidden ones are skipped). `include` and
+    `exclude` are glob patterns matched case-insensitively against the file
+    name, or against the path relative to `folder` when they contain a "/".
+    Excluded folders are not entered at all.
+    """
+    def __init__(self, folder, recursive=False, include=(), exclude=()):
+        self.folder = folder
+        self.recursive = recursive
+        self.include = [p.lower() for p in include]
+        self.exclude = [p.lower() for p in exclude]
+        self.entries = {}
+        self.dirs = set()
+
+    @property
+    def settings(self):
+        return (self.folder, self.recursive, tuple(self.include), tuple(self.exclude))
+
+    def _matches(self, path, patterns):
+        rel = os.path.relpath(path, self.folder).replace(os.sep, "/").lower()
+        name = rel.rsplit("/", 1)[-1]
+        return any(fnmatch.fnmatchcase(rel if "/" in p else name, p) for p in patterns)
+
+    def wanted(self, path):
+        # Hidden files include partial renders and macOS "._" metadata
+        if os.path.basename(path).startswith(".") or not path.lower().endswith(VIDEO_EXTS + IMAGE_EXTS):
+            return False
+        if self.include and not self._matches(path, self.include):
+            return False
+        return not self._matches(path, self.exclude)
+
+    def wanted_dir(self, path):
+        return not os.path.basename(path).startswith(".") and not self._matches(path, self.exclude)
+
+    def _scan(self, top):
+        stack = [top]
+        while stack:
+            folder = stack.pop()
+            self.dirs.add(folder)
+            try:
+                it = os.scandir(folder)
+            except OSError:
+                continue
+            with it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            if self.recursive and self.wanted_dir(e.path):
+                                stack.append(e.path)
+                        elif self.wanted(e.path):
+                            # Free on Windows, where scandir already returned it
+                            st = e.stat()
+                            self.entries[e.path] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        pass  # Removed while scanning
+
+    def _update(self, path):
+        if path in self.dirs or (self.recursive and os.path.isdir(path)):
+            # A folder appeared, disappeared or was renamed: scan that subtree again
+            prefix = path + os.sep
+            self.entries = {p: v for p, v in self.entries.items() if not p.startswith(prefix)}
+            self.dirs = {d for d in self.dirs if d != path and not d.startswith(prefix)}
+            if os.path.isdir(path) and self.wanted_dir(path):
+                self._scan(path)
+            return
+        if not self.wanted(path):
+            return
+        try:
+            st = os.stat(path)
+            if stat.S_ISREG(st.st_mode):
+                self.entries[path] = (st.st_size, st.st_mtime_ns)
+                return
+        except OSError:
+            pass
+        self.entries.pop(path, None)
+
+    def refresh(self, paths=None):
+        """
+        Scan the folder again, or with `paths` only look at those files and
+        folders (e.g. reported by change notifications).
+        Returns a {path: (size, mtime)} snapshot.
+        """
+        if paths is None or not self.dirs:
+            self.entries, self.dirs = {}, set()
+            self._scan(self.folder)
+        else:
+            for path in paths:
+                self._update(path)
+        return dict(self.entries)
+
+    def files(self, order_mode):
+        """The indexed files in `order_mode`, without touching the disk"""
+        files = list(self.entries)
+        if order_mode == ORDER_RANDOM:
+            random.shuffle(files)
+            return files
+        if order_mode == ORDER_DATE_NEW:
+            return sorted(files, key=lambda p: self.entries[p][1], reverse=True)
+        if order_mode == ORDER_DATE_OLD:
+            return sorted(files, key=lambda p: self.entries[p][1])
+        return sorted(files, key=lambda p: os.path.relpath(p, self.folder).lower())
+
+
+def list_media_files(folder, order_mode, recursive=False, include=(), exclude=()):
+    if not os.path.isdir(folder):
+        return []
+
+    index = MediaIndex(folder, recursive, include, exclude)
+    index.refresh()
+    return index.files(order_mode)
+
+
+# ================= MEDIA PROBING =================
+PROBE_CACHE_FILE = os.path.join(get_app_data_dir(), "probe_cache.json")
+PROBE_CACHE_MAX_ENTRIES = 50000
+# Bump when probe_media() returns different fields
+PROBE_CACHE_VERSION = 2
+
+_probe_cache = None
+_probe_cache_dirty = False
+_probe_cache_lock = threading.Lock()
+
+
+def _parse_rate(rate):
+    """'30000/1001' -> 29.97"""
+    try:
+        num, _, den = str(rate).partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def probe_media(path):
+    """
+    Collect duration and stream metadata of a media file with one ffprobe call.
+    Raises CalledProcessError / ValueError when the file cannot be read.
+    """
+    r = subprocess.run(
+        [
+            get_ffmpeg()[1], "-v", "error",
+            "-show_data_hash", "sha256",
+            "-show_entries",
+            "format=duration:"
+            "stream=codec_type,codec_name,profile,width,height,pix_fmt,"
+            "r_frame_rate,avg_frame_rate,time_base,sample_rate,channels,duration,"
+            "extradata_hash:stream_tags=rotate:stream_side_data=rotation",
+            "-of", "json",
+            path
+        ],
+        capture_output=True, text=True, check=True
+    )
+    data = json.loads(r.stdout)
+    streams = [
+        st for st in data.get("streams", [])
+        if st.get("codec_type") in ("video", "audio")
+    ]
+    video = next((st for st in streams if st["codec_type"] == "video"), {})
+    audio = next((st for st in streams if st["codec_type"] == "audio"), {})
+
+    rotation = video.get("tags", {}).get("rotate") or 0
+    for side_data in video.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    for st in streams:
+        st.pop("tags", None)
+        st.pop("side_data_list", None)
+
+    duration = data.get("format", {}).get("duration") or video.get("duration") or 0
+    return {
+        "duration": float(duration),
+        "video_codec": video.get("codec_name"),
+        "width": int(video.get("width") or 0),
+        "height": int(video.get("height") or 0),
+        "fps": _parse_rate(video.get("avg_frame_rate")) or _parse_rate(video.get("r_frame_rate")),
+        "pix_fmt": video.get("pix_fmt"),
+        "rotation": int(float(rotation)) % 360,
+        "has_audio": bool(audio),
+        "audio_codec": audio.get("codec_name"),
+        "sample_rate": int(audio.get("sample_rate") or 0),
+        "channels": int(audio.get("channels") or 0),
+        "streams": streams,
+    }
+
+
+def _load_probe_cache():
+    global _probe_cache
+    if _probe_cache is None:
+        try:
+            with open(PROBE_CACHE_FILE, encoding="utf-8") as f:
+                _probe_cache = json.load(f)
+        except Exception:
+            _probe_cache = {}
+    return _probe_cache
+
+
+def save_probe_cache():
+    """Merge this process' probe results into the probe cache file"""
+    global _probe_cache_dirty
+    with _probe_cache_lock:
+        if not _probe_cache_dirty:
+            return
+        entries = dict(_load_probe_cache())
+        _probe_cache_dirty = False
+    merge_cache_file(PROBE_CACHE_FILE, entries, PROBE_CACHE_MAX_ENTRIES)
+
+
+def merge_cache_file(path, entries, max_entries):
+    """
+    Write the cache `entries` (values with a "used" time) to `path`, keeping
+    entries other processes wrote since it was loaded and the `max_entries`
+    most recently used.
+    """
+    try:
+        # Keep entries written by other runs since we loaded the file
+        with open(path, encoding="utf-8") as f:
+            on_disk = json.load(f)
+        for key, entry in on_disk.items():
+            if key not in entries or entries[key]["used"] < entry["used"]:
+                entries[key] = entry
+    except Exception:
+        pass
+
+    if len(entries) > max_entries:
+        newest = sorted(entries.items(), key=lambda kv: kv[1]["used"], reverse=True)
+        entries = dict(newest[:max_entries])
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # The cache is only an optimization
+
+
+def probe_media_cached(path):
+    """probe_media() memoized on (path, size, mtime) in the probe cache"""
+    global _probe_cache_dirty
+    st = os.stat(path)
+    key = os.path.normcase(os.path.abspath(path))
+
+    with _probe_cache_lock:
+        entry = _load_probe_cache().get(key)
+        if (entry and entry.get("v") == PROBE_CACHE_VERSION
+                and entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns):
+            entry["used"] = time.time()
+            return entry["info"]
+
+    start = time.monotonic()
+    try:
+        info = probe_media(path)
+    finally:
+        record_metric("probes", {"file": path, "bytes": st.st_size,
+                                 "seconds": round(time.monotonic() - start, 3)})
+
+    with _probe_cache_lock:
+        _load_probe_cache()[key] = {
+            "v": PROBE_CACHE_VERSION,
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "used": time.time(),
+            "info": info,
+        }
+        _probe_cache_dirty = True
+    return info
+
+
+def probe_files(paths, workers=DEFAULT_WORKERS):
+    """
+    Probe many files concurrently. Returns {path: info}; files that
+    cannot be probed map to None.
+    """
+    def probe(path):
+        try:
+            return probe_media_cached(path)
+        except Exception:
+            return None
+
+    unique = list(dict.fromkeys(paths))
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+        results = dict(zip(unique, pool.map(probe, unique)))
+    save_probe_cache()
+    return results
+
+
+def get_video_duration(path):
+    try:
+        return probe_media_cached(path)["duration"]
+    except:
+        return 0.0
+
+
+def estimate_total_duration(files, image_duration, workers=DEFAULT_WORKERS):
+    videos = [f for f in files if not f.lower().endswith(IMAGE_EXTS)]
+    info = probe_files(videos, workers)
+
+    total = 0.0
+    for f in files:
+        if f.lower().endswith(IMAGE_EXTS):
+            total += image_duration
+        elif info.get(f):
+            total += info[f]["duration"]
+    return total
+
+
+# ================= DUPLICATES =================
+HASH_CACHE_FILE = os.path.join(get_app_data_dir(), "hash_cache.json")
+HASH_CACHE_MAX_ENTRIES = 50000
+# Bytes hashed from the start and from the end of a file for the quick comparison
+PARTIAL_HASH_BYTES = 64 * 1024
+HASH_BLOCK_BYTES = 1024 * 1024
+
+_hash_cache = None
+_hash_cache_dirty = False
+_hash_cache_lock = threading.Lock()
+
+
+def partial_hash(path, size):
+    """Hash of the size, the first and the last PARTIAL_HASH_BYTES of a file"""
+    h = hashlib.sha1(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        h.update(f.read(PARTIAL_HASH_BYTES))
+        if size > PARTIAL_HASH_BYTES:
+            f.seek(max(PARTIAL_HASH_BYTES, size - PARTIAL_HASH_BYTES))
+            h.update(f.read(PARTIAL_HASH_BYTES))
+    return h.hexdigest()
+
+
+def full_hash(path, size):
+    h = hashlib.sha1(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            check_cancelled()
+            h.update(block)
+    return h.hexdigest()
+
+
+def _load_hash_cache():
+    global _hash_cache
+    if _hash_cache is None:
+        try:
+            with open(HASH_CACHE_FILE, encoding="utf-8") as f:
+                _hash_cache = json.load(f)
+        except Exception:
+            _hash_cache = {}
+    return _hash_cache
+
+
+def save_hash_cache():
+    """Merge this process' hashes into the hash cache file"""
+    global _hash_cache_dirty
+    with _hash_cache_lock:
+        if not _hash_cache_dirty:
+            return
+        entries = dict(_load_hash_cache())
+        _hash_cache_dirty = False
+    merge_cache_file(HASH_CACHE_FILE, entries, HASH_CACHE_MAX_ENTRIES)
+
+
+def content_hash(path, kind):
+    """partial_hash() or full_hash() ("partial"/"full") memoized on (path, size, mtime)"""
+    global _hash_cache_dirty
+    st = os.stat(path)
+    key = os.path.normcase(os.path.abspath(path))
+
+    with _hash_cache_lock:
+        entry = _load_hash_cache().get(key)
+        if not entry or entry["size"] != st.st_size or entry["mtime"] != st.st_mtime_ns:
+            entry = _load_hash_cache()[key] = {"size": st.st_size, "mtime": st.st_mtime_ns}
+        entry["used"] = time.time()
+        if kind in entry:
+            return entry[kind]
+
+    digest = (partial_hash if kind == "partial" else full_hash)(path, st.st_size)
+    with _hash_cache_lock:
+        entry[kind] = digest
+        _hash_cache_dirty = True
+    return digest
+
+
+def find_duplicates(files, workers=DEFAULT_WORKERS):
+    """
+    Map every file whose content repeats an earlier file of `files` to that
+    first occurrence. Only files of the same size (and kind) are compared:
+    first by partial_hash(), then the ones still alike by full_hash().
+    Hashes are cached, so unchanged files are not read again.
+    """
+    groups = {}
+    for f in dict.fromkeys(files):
+        try:
+            size = os.stat(f).st_size
+        except OSError:
+            continue
+        groups.setdefault((f.lower().endswith(IMAGE_EXTS), size), []).append(f)
+    groups = [group for group in groups.values() if len(group) > 1]
+
+    def digest(path, kind):
+        try:
+            return content_hash(path, kind)
+        except OSError:
+            return None
+
+    for kind in ("partial", "full"):
+        if not groups:
+            break
+        paths = [f for group in groups for f in group]
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+            hashes = dict(zip(paths, pool.map(lambda f: digest(f, kind), paths)))
+        alike = {}
+        for i, group in enumerate(groups):
+            for f in group:
+                if hashes[f] is not None:
+                    alike.setdefault((i, hashes[f]), []).append(f)
+        groups = [group for group in alike.values() if len(group) > 1]
+    save_hash_cache()
+
+    # Groups keep the order of `files`
+    return {f: group[0] for group in groups for f in group[1:]}
+
+
+# ================= RUN METRICS =================
+METRICS_VERSION = 1
+# Kept out of the output folder, which should only hold videos
+METRICS_DIR = os.path.join(get_app_data_dir(), "metrics")
+# Older metrics files are removed
+METRICS_KEEP = 100
+# RunMetrics of the render in progress, see render_files()
+_metrics = None
+
+
+class RunMetrics:
+    """Timings and sizes collected during one render, see save_run_metrics()"""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.probes = []
+        self.loudness = []
+        self.clips = []
+        self.processes = []
+
+    def add(self, kind, record):
+        with self.lock:
+            getattr(self, kind).append(record)
+
+    def to_dict(self, **result):
+        with self.lock:
+            return {
+                "version": METRICS_VERSION,
+                "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+                "seconds": round(time.time() - self.started, 3),
+                "settings": self.settings,
+                **result,
+                "stages": dict(self.stages),
+                "probes": list(self.probes),
+                "loudness": list(self.loudness),
+                "clips": list(self.clips),
+                "processes": list(self.processes),
+            }
+
+
+def save_run_metrics(result, ts):
+    """Write RunMetrics.to_dict() to METRICS_DIR, keeping the newest METRICS_KEEP files"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    # Renders of other folders or processes may start in the same second
+    path = os.path.join(METRICS_DIR, f"metrics_{ts}_{os.getpid()}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    names = sorted(n for n in os.listdir(METRICS_DIR)
+                   if n.startswith("metrics_") and n.endswith(".json"))
+    for name in names[:-METRICS_KEEP]:
+        try:
+            os.remove(os.path.join(METRICS_DIR, name))
+        except OSError:
+            pass
+    return path
+
+
+def record_metric(kind, record):
+    """Add a probe/loudness/clip/process record to the render in progress, if any"""
+    metrics = _metrics
+    if metrics is not None:
+        metrics.add(kind, record)
+
+
+@contextmanager
+def metrics_stage(name):
+    """Add the time spent in the block to stage `name` of the render in progress"""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        metrics = _metrics
+        if metrics is not None:
+            with metrics.lock:
+                elapsed = metrics.stages.get(name, 0.0) + time.monotonic() - start
+                metrics.stages[name] = round(elapsed, 3)
+
+
+# ------------------------------------------------
+
+class RenderCancelled(Exception):
+    """Raised by FFmpeg helpers after cancel_renders() was called"""
+
+
+_cancel_event = threading.Event()
+_running_processes = set()
+# Latest `-progress` report of each running FFmpeg process
+_live_progress = {}
+_running_lock = threading.Lock()
+
+
+def cancel_renders():
+    """Stop every render in this process: kill running FFmpeg and refuse new ones"""
+    _cancel_event.set()
+    with _running_lock:
+        for proc in list(_running_processes):
+            try:
+                proc.kill()
+            except OSError:
+                pass
+
+
+def reset_cancel():
+    """Allow FFmpeg to run again after cancel_renders()"""
+    _cancel_event.clear()
+
+
+def check_cancelled():
+    if _cancel_event.is_set():
+        raise RenderCancelled("Render cancelled")
+
+
+def ffmpeg_inputs(args):
+    return [args[i + 1] for i, a in enumerate(args[:-1]) if a == "-i"]
+
+
+def ffmpeg_label(inputs):
+    """Short name of what an FFmpeg call works on: its first input"""
+    if not inputs:
+        return ""
+    label = os.path.basename(inputs[0])
+    return label + (f" (+{len(inputs) - 1})" if len(inputs) > 1 else "")
+
+
+def _parse_speed(value):
+    """'1.52x' -> 1.52, 'N/A' -> None"""
+    try:
+        return float(str(value).rstrip("x"))
+    except ValueError:
+        return None
+
+
+def _parse_number(value, kind=float):
+    """Number of a progress report field, 0 for 'N/A' or a missing field"""
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return kind(0)
+
+
+def run_ffmpeg(args):
+    """
+    Run FFmpeg quietly, raising CalledProcessError with its stderr on failure.
+    Progress reports are read while it runs (see live_throughput()).
+    Returns the final `-progress` report as a dict (out_time_us, frame, ...)
+    with FFmpeg's log under "stderr".
+    """
+    check_cancelled()
+    cmd = [get_ffmpeg()[0], "-hide_banner", "-nostdin", "-nostats", "-progress", "pipe:1"] + args
+    inputs = ffmpeg_inputs(args)
+    label = ffmpeg_label(inputs)
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True, errors="replace"
+    )
+    with _running_lock:
+        _running_processes.add(proc)
+
+    # stderr is drained on a thread so a chatty FFmpeg never blocks on a full pipe
+    stderr_parts = []
+    reader = threading.Thread(target=lambda: stderr_parts.append(proc.stderr.read()), daemon=True)
+    reader.start()
+
+    report, block = {}, {}
+    try:
+        for line in proc.stdout:
+            key, sep, value = line.partition("=")
+            if not sep:
+                continue
+            block[key.strip()] = value.strip()
+            if key.strip() == "progress":
+                report, block = block, {}
+                with _running_lock:
+                    _live_progress[proc] = dict(report, label=label, started=start)
+        proc.wait()
+        reader.join()
+    finally:
+        with _running_lock:
+            _running_processes.discard(proc)
+            _live_progress.pop(proc, None)
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+    stderr = "".join(stderr_parts)
+    record_metric("processes", {
+        "inputs": inputs,
+        "output": args[-1],
+        "seconds": round(time.monotonic() - start, 3),
+        "frames": _parse_number(report.get("frame"), int),
+        "fps": _parse_number(report.get("fps")),
+        "speed": _parse_speed(report.get("speed")),
+        "bytes": _parse_number(report.get("total_size"), int),
+        "ok": proc.returncode == 0,
+    })
+
+    check_cancelled()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stderr=stderr)
+    return dict(report, stderr=stderr)
+
+
+def live_throughput():
+    """
+    Combined throughput of the FFmpeg processes running right now, or None:
+    {"processes", "fps", "speed", "bytes", "slowest"} where speed is the sum of
+    the realtime multipliers and slowest the label of the slowest process.
+    """
+    with _running_lock:
+        live = list(_live_progress.values())
+    if not live:
+        return None
+
+    fps = speed = 0.0
+    size = 0
+    slowest, slowest_speed = None, None
+    now = time.monotonic()
+    for report in live:
+        fps += _parse_number(report.get("fps"))
+        size += _parse_number(report.get("total_size"), int)
+        current = _parse_speed(report.get("speed"))
+        if current is None:
+            continue
+        speed += current
+        # A process needs a moment before its speed means anything
+        if now - report["started"] > 1.0 and (slowest_speed is None or current < slowest_speed):
+            slowest, slowest_speed = report["label"], current
+    return {"processes": len(live), "fps": fps, "speed": speed, "bytes": size, "slowest": slowest}
+
+
+def format_throughput(throughput):
+    """One line description of live_throughput() for the progress display"""
+    if not throughput:
+        return ""
+    jobs = throughput["processes"]
+    text = (f"{jobs} FFmpeg job{'s' if jobs != 1 else ''} · {throughput['fps']:.0f} fps · "
+            f"{throughput['speed']:.2f}x realtime · {throughput['bytes'] / 1024 ** 2:.1f} MB")
+    if jobs > 1 and throughput["slowest"]:
+        text += f" · slowest: {throughput['slowest']}"
+    return text
+
+
+def encoded_duration(report, fps=None):
+    """
+    Duration of the encoded output according to FFmpeg's progress report.
+    With a constant output `fps` the frame count gives the exact video length.
+    """
+    try:
+        if fps and int(report.get("frame", 0)) > 0:
+            return int(report["frame"]) / float(fps)
+        return max(0.0, int(report.get("out_time_us", 0)) / 1_000_000)
+    except ValueError:
+        return 0.0
+
+
+def describe_error(e):
+    """Short, human readable reason for a failed media file"""
+    if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+        lines = [l for l in e.stderr.strip().splitlines() if l.strip()]
+        if lines:
+            return lines[-1].strip()
+    return str(e) or e.__class__.__name__
+
+
+# ================= LOUDNESS =================
+# Every clip gets the same audio stream: AAC 48 kHz stereo, silence for
+# images and silent videos. Source audio is brought to the EBU R128 target
+# with FFmpeg's two-pass loudnorm; the first pass reads the whole track, so
+# its measurement is kept with the file's probe in the probe cache.
+LOUDNESS_TARGET = "I=-16:TP=-1.5:LRA=11"
+# Quieter than this is silence, loudnorm cannot be given its measurement
+LOUDNESS_FLOOR = -70.0
+AUDIO_FORMAT_FILTER = "aresample=48000,aformat=sample_fmts=fltp:channel_layouts=stereo"
+SILENCE_SOURCE = "anullsrc=r=48000:cl=stereo"
+CLIP_AUDIO_ARGS = ["-c:a", "aac", "-b:a", "192k", "-ar", "48000", "-ac", "2"]
+
+
+def measure_loudness(path):
+    """
+    First loudnorm pass over the audio of `path`. Returns the measurement
+    for loudnorm_filter(), empty when the track is silent.
+    """
+    report = run_ffmpeg([
+        "-i", path,
+        "-map", "0:a:0",
+        "-af", f"loudnorm={LOUDNESS_TARGET}:print_format=json",
+        "-f", "null", "-"
+    ])
+    log = report["stderr"]
+    data = json.loads(log[log.rindex("{"):log.rindex("}") + 1])
+    try:
+        if float(data["input_i"]) < LOUDNESS_FLOOR:
+            return {}
+    except ValueError:  # -inf
+        return {}
+    return {key: data[key] for key in
+            ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")}
+
+
+def measure_loudness_cached(path):
+    """
+    measure_loudness() memoized with the probe of `path`, so it only runs
+    again when the file changes. None when the file has no audio.
+    """
+    global _probe_cache_dirty
+    if not probe_media_cached(path)["has_audio"]:
+        return None
+    key = os.path.normcase(os.path.abspath(path))
+
+    with _probe_cache_lock:
+        entry = _load_probe_cache().get(key)
+        if entry and "loudness" in entry:
+            return entry["loudness"]
+
+    start = time.monotonic()
+    try:
+        loudness = measure_loudness(path)
+    finally:
+        record_metric("loudness", {"file": path, "seconds": round(time.monotonic() - start, 3)})
+
+    with _probe_cache_lock:
+        entry = _load_probe_cache().get(key)
+        if entry:
+            entry["loudness"] = loudness
+            _probe_cache_dirty = True
+    return loudness
+
+
+def source_loudness(path):
+    """
+    (has_audio, measurement) of a source; a track that cannot be measured
+    is used as it is, a file that cannot be probed counts as silent.
+    """
+    try:
+        info = probe_media_cached(path)
+    except Exception:
+        return False, None
+    if not info["has_audio"]:
+        return False, None
+    try:
+        return True, measure_loudness_cached(path)
+    except RenderCancelled:
+        raise
+    except Exception:
+        return True, {}
+
+
+def measure_files(paths, workers=DEFAULT_WORKERS):
+    """Measure the loudness of many files concurrently, ahead of rendering them"""
+    unique = list(dict.fromkeys(paths))
+    with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+        list(pool.map(source_loudness, unique))
+    save_probe_cache()
+
+
+def loudnorm_filter(loudness):
+    """Audio filter bringing a measured track to LOUDNESS_TARGET in 48 kHz stereo"""
+    if not loudness:
+        return AUDIO_FORMAT_FILTER
+    return (
+        f"loudnorm={LOUDNESS_TARGET}:measured_I={loudness['input_i']}"
+        f":measured_TP={loudness['input_tp']}:measured_LRA={loudness['input_lra']}"
+        f":measured_thresh={loudness['input_thresh']}:offset={loudness['target_offset']}"
+        f":linear=true,{AUDIO_FORMAT_FILTER}"
+    )
+
+
+def clip_audio_args(path, inputs=1):
+    """
+    (extra inputs, output arguments) giving a clip of `path`, input 0 of
+    `inputs`, its uniform audio: the normalized source audio padded to the
+    video length, or silence.
+    """
+    has_audio, loudness = source_loudness(path)
+    if has_audio:
+        extra = []
+        audio = ["-map", "0:a:0", "-af", f"{loudnorm_filter(loudness)},apad"]
+    else:
+        extra = ["-f", "lavfi", "-i", SILENCE_SOURCE]
+        audio = ["-map", f"{inputs}:a:0"]
+    return extra, [*audio, *CLIP_AUDIO_ARGS, "-shortest"]
+
+
+def normalize_video(input_video, out_dir, out_name=None, profile=PROFILE_BALANCED, threads=0,
+                    size=None):
+    out = os.path.join(
+        out_dir,
+        out_name or os.path.splitext(os.path.basename(input_video))[0] + "_norm.mp4"
+    )
+
+    extra_inputs, audio_args = clip_audio_args(input_video)
+    report = run_ffmpeg([
+        "-y",
+        "-err_detect", "ignore_err",
+        "-i", input_video,
+        *extra_inputs,
+        "-map", "0:v:0",
+        "-vf", aspect_safe_filter(size),
+        "-r", profile_fps(profile),
+        *x264_args(profile, threads),
+        *audio_args,
+        "-movflags", "+faststart",
+        out
+    ])
+
+    # Taken from the encode itself, no need to probe the result again
+    return out, encoded_duration(report, profile_fps(profile)) or get_video_duration(out)
+
+
+def is_conforming_video(info, size=None, fps=TARGET_FPS):
+    """True when a probed video already matches the output format exactly"""
+    w, h = size or (TARGET_W, TARGET_H)
+    return (
+        info is not None
+        and info["video_codec"] == "h264"
+        and info["width"] == w
+        and info["height"] == h
+        and info["pix_fmt"] == "yuv420p"
+        and info["rotation"] == 0
+        and abs(info["fps"] - float(fps)) < 0.01
+    )
+
+
+def remux_video(input_video, out_dir, out_name, info):
+    """Copy the video of an already conforming video into a clip, only its audio is encoded"""
+    out = os.path.join(out_dir, out_name)
+
+    extra_inputs, audio_args = clip_audio_args(input_video)
+    run_ffmpeg([
+        "-y",
+        "-i", input_video,
+        *extra_inputs,
+        "-map", "0:v:0",
+        "-c:v", "copy",
+        *audio_args,
+        "-movflags", "+faststart",
+        out
+    ])
+
+    return out, info["duration"]
+
+
+def image_to_video(image_path, out_dir, image_duration, out_name=None,
+                   profile=PROFILE_BALANCED, threads=0, size=None):
+    out = os.path.join(
+        out_dir,
+        out_name or os.path.splitext(os.path.basename(image_path))[0] + "_img.mp4"
+    )
+
+    # The image is decoded once; `-loop 1` would retry a broken file forever
+    report = run_ffmpeg([
+        "-y",
+        "-i", image_path,
+        "-f", "lavfi", "-i", SILENCE_SOURCE,
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-vf", still_image_filter(image_duration, size, profile_fps(profile)),
+        "-r", profile_fps(profile),
+        *x264_args(profile, threads),
+        *CLIP_AUDIO_ARGS,
+        "-shortest",
+        *STILL_IMAGE_ARGS,
+        out
+    ])
+
+    return out, encoded_duration(report, profile_fps(profile)) or float(image_duration)
+
+
+# ================= CLIP CACHE =================
+# Bump when the FFmpeg arguments used for clips change
+CLIP_CACHE_VERSION = 5
+
+
+def clip_cache_key(path, image_duration, profile=PROFILE_BALANCED, size=None, remux=False):
+    """
+    Cache key for the normalized clip of `path` with the current settings.
+    `remux` as in build_clip(): conforming videos get another clip with it.
+    """
+    st = os.stat(path)
+    is_image = path.lower().endswith(IMAGE_EXTS)
+    w, h = size or (TARGET_W, TARGET_H)
+    ident = {
+        "v": CLIP_CACHE_VERSION,
+        "path": os.path.normcase(os.path.abspath(path)),
+        "size": st.st_size,
+        "mtime": st.st_mtime_ns,
+        "w": w,
+        "h": h,
+        "fps": profile_fps(profile),
+        "filter": aspect_safe_filter(size),
+        "image_duration": float(image_duration) if is_image else None,
+        "profile": ENCODE_PROFILES[profile],
+    }
+    if remux and not is_image:
+        ident["remux"] = True
+    return hashlib.sha1(json.dumps(ident, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def clip_cache_paths(cache_dir, key):
+    """(clip, metadata) paths of a cache entry"""
+    folder = os.path.join(cache_dir, key[:2])
+    return os.path.join(folder, key + ".mp4"), os.path.join(folder, key + ".json")
+
+
+def clip_cache_lookup(cache_dir, key):
+    """Return (clip, duration) for a complete cache entry, or None"""
+    clip, meta = clip_cache_paths(cache_dir, key)
+    try:
+        with open(meta, encoding="utf-8") as f:
+            duration = float(json.load(f)["duration"])
+        if not os.path.isfile(clip):
+            return None
+        # Mark as recently used for LRU eviction
+        now = time.time()
+        os.utime(clip, (now, now))
+        return clip, duration
+    except Exception:
+        return None
+
+
+def clip_cache_store(cache_dir, key, source, encode):
+    """
+    Create a cache entry by calling encode(out_dir, out_name) -> duration.
+    The clip is written under a private temporary name and renamed into
+    place, so concurrent runs never see a half written file.
+    """
+    clip, meta = clip_cache_paths(cache_dir, key)
+    folder = os.path.dirname(clip)
+    os.makedirs(folder, exist_ok=True)
+
+    tmp_name = f"{key}.{os.getpid()}-{threading.get_ident()}.tmp.mp4"
+    tmp = os.path.join(folder, tmp_name)
+    try:
+        duration = encode(folder, tmp_name)
+        os.replace(tmp, clip)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    tmp_meta = meta + f".{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "duration": duration}, f)
+    os.replace(tmp_meta, meta)
+
+    return clip, duration
+
+
+def prune_clip_cache(cache_dir, max_bytes=CLIP_CACHE_MAX_BYTES,
+                     grace_seconds=CLIP_CACHE_GRACE_SECONDS):
+    """Evict least recently used clips until the cache fits in max_bytes"""
+    if not cache_dir or not os.path.isdir(cache_dir):
+        return
+
+    entries, total = [], 0
+    now = time.time()
+    for sub in os.scandir(cache_dir):
+        if not sub.is_dir():
+            continue
+        for e in os.scandir(sub.path):
+            try:
+                st = e.stat()
+            except OSError:
+                continue
+            total += st.st_size
+            if e.name.endswith(".mp4") and ".tmp" not in e.name:
+                entries.append((st.st_mtime, st.st_size, e.path))
+            elif ".tmp" in e.name and now - st.st_mtime > grace_seconds:
+                # Leftover from a crashed run
+                entries.append((st.st_mtime, st.st_size, e.path))
+
+    entries.sort()
+    for mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        if now - mtime < grace_seconds:
+            break
+        try:
+            os.remove(path)
+            total -= size
+            if path.endswith(".mp4"):
+                os.remove(os.path.splitext(path)[0] + ".json")
+        except OSError:
+            pass  # Removed by another run or still in use
+
+
+# ------------------------------------------------
+
+# How a clip was produced, for the per-run report
+CLIP_CACHED = "cached"
+CLIP_REMUXED = "remuxed"
+CLIP_TRANSCODED = "transcoded"
+CLIP_IMAGE = "image"
+CLIP_DUPLICATE = "duplicate"
+
+
+def build_clip(path, temp_dir, image_duration, cache_dir=None,
+               profile=PROFILE_BALANCED, threads=0, size=None, remux=False):
+    """
+    Normalize a single media file to `size`, returns (clip, duration, method).
+    With `remux` a conforming video is remuxed instead of encoded; see
+    remux_sources() for when that is allowed.
+    """
+    is_image = path.lower().endswith(IMAGE_EXTS)
+    method = CLIP_IMAGE
+
+    def encode(out_dir, out_name):
+        nonlocal method
+        if is_image:
+            return image_to_video(path, out_dir, image_duration, out_name, profile, threads,
+                                  size)[1]
+
+        try:
+            info = probe_media_cached(path)
+        except Exception:
+            info = None
+        if remux and is_conforming_video(info, size, profile_fps(profile)):
+            try:
+                method = CLIP_REMUXED
+                return remux_video(path, out_dir, out_name, info)[1]
+            except subprocess.CalledProcessError:
+                pass  # Transcode instead
+
+        method = CLIP_TRANSCODED
+        return normalize_video(path, out_dir, out_name, profile, threads, size)[1]
+
+    if cache_dir:
+        key = clip_cache_key(path, image_duration, profile, size, remux)
+        hit = clip_cache_lookup(cache_dir, key)
+        if hit:
+            return hit + (CLIP_CACHED,)
+        return clip_cache_store(cache_dir, key, path, encode) + (method,)
+
+    # Prefix with a hash of the full path so files sharing a base name never collide
+    prefix = hashlib.sha1((os.path.abspath(path) + str(size or "")).encode("utf-8")).hexdigest()[:8]
+    base = prefix + "_" + os.path.splitext(os.path.basename(path))[0]
+    out_name = base + ("_img.mp4" if is_image else "_norm.mp4")
+    duration = encode(temp_dir, out_name)
+    return os.path.join(temp_dir, out_name), duration, method
+
+
+def slideshow_to_video(images, out_dir, image_duration, out_name,
+                       profile=PROFILE_BALANCED, threads=0, size=None):
+    """Encode consecutive images into one clip with a single FFmpeg process"""
+    out = os.path.join(out_dir, out_name)
+    segments = [(path, float(image_duration), False) for path in images]
+
+    report = run_ffmpeg(direct_render_args(
+        segments, out, True, out + ".graph.txt",
+        x264_args(profile, threads) + STILL_IMAGE_ARGS, size, fps=profile_fps(profile)
+    ))
+    os.remove(out + ".graph.txt")
+
+    return out, encoded_duration(report, profile_fps(profile)) or get_video_duration(out)
+
+
+def slideshow_cache_key(images, image_duration, profile=PROFILE_BALANCED, size=None):
+    """Cache key for the slideshow clip of a run of images"""
+    parts = [clip_cache_key(path, image_duration, profile, size) for path in images]
+    return hashlib.sha1(("slideshow:" + ",".join(parts)).encode("utf-8")).hexdigest()
+
+
+def cached_sources(files, image_duration, profile=PROFILE_BALANCED, remux=False,
+                   cache_dir=CLIP_CACHE_DIR):
+    """Files of `files` whose clip (or slideshow clip) is in the clip cache"""
+    cached = set()
+    for job in group_image_runs(list(dict.fromkeys(files))):
+        try:
+            key = (slideshow_cache_key(job, image_duration, profile) if len(job) > 1
+                   else clip_cache_key(job[0], image_duration, profile, None, remux))
+        except OSError:
+            continue
+        if cache_dir and clip_cache_lookup(cache_dir, key):
+            cached.update(job)
+    return cached
+
+
+def build_slideshow(images, temp_dir, image_duration, cache_dir=None,
+                    profile=PROFILE_BALANCED, threads=0, size=None):
+    """Slideshow clip for a run of images, returns (clip, duration, method)"""
+    def encode(out_dir, out_name):
+        return slideshow_to_video(images, out_dir, image_duration, out_name, profile, threads,
+                                  size)[1]
+
+    if cache_dir:
+        key = slideshow_cache_key(images, image_duration, profile, size)
+        hit = clip_cache_lookup(cache_dir, key)
+        if hit:
+            return hit + (CLIP_CACHED,)
+        return clip_cache_store(cache_dir, key, images, encode) + (CLIP_IMAGE,)
+
+    ident = "\n".join(os.path.abspath(path) for path in images) + str(size or "")
+    out_name = hashlib.sha1(ident.encode("utf-8")).hexdigest()[:16] + "_slides.mp4"
+    return (os.path.join(temp_dir, out_name), encode(temp_dir, out_name), CLIP_IMAGE)
+
+
+def group_image_runs(files, max_images=SLIDESHOW_MAX_IMAGES, singles=()):
+    """
+    Split files into jobs: one per video, runs of consecutive images together.
+    Images in `singles` get a job of their own.
+    """
+    jobs = []
+    for f in files:
+        is_image = f.lower().endswith(IMAGE_EXTS) and f not in singles
+        if (is_image and jobs and len(jobs[-1]) < max_images
+                and jobs[-1][-1].lower().endswith(IMAGE_EXTS) and jobs[-1][-1] not in singles):
+            jobs[-1].append(f)
+        else:
+            jobs.append([f])
+    return jobs
+
+
+def build_job(job, temp_dir, image_duration, cache_dir=None,
+              profile=PROFILE_BALANCED, threads=0, size=None, remux=False):
+    """
+    Build the clip(s) of one job from group_image_runs(). Returns a list of
+    (paths, result) where result is (clip, duration, method) or the exception.
+    A failing slideshow is retried image by image so only broken images are lost.
+    """
+    if len(job) > 1:
+        try:
+            return [(job, build_slideshow(job, temp_dir, image_duration, cache_dir,
+                                          profile, threads, size))]
+        except RenderCancelled:
+            raise
+        except Exception:
+            pass
+
+    outcomes = []
+    for path in job:
+        try:
+            outcomes.append(([path], build_clip(path, temp_dir, image_duration, cache_dir,
+                                                profile, threads, size, remux)))
+        except RenderCancelled:
+            raise
+        except Exception as e:
+            outcomes.append(([path], e))
+    return outcomes
+
+
+def build_clips(files, temp_dir, image_duration, progress_cb,
+                workers=DEFAULT_WORKERS, errors=None, cache_dir=None, stats=None,
+                clip_sources=None, profile=PROFILE_BALANCED, size=None, duplicates=None,
+                spool=None, remux=None):
+    """
+    Normalize all files to `size` (TARGET_W x TARGET_H by default) using a
+    pool of `workers` FFmpeg processes, encoded with `profile`; each process
+    gets its share of the CPU cores.
+    Clips keep the order of `files`; consecutive images become one slideshow
+    clip. Files that fail are skipped and appended to `errors` as
+    (path, reason) when a list is given.
+    With a `cache_dir`, clips are reused from / stored in the clip cache.
+    `duplicates` maps files to an earlier file with the same content (see
+    find_duplicates()); each content is encoded once and its clip repeated.
+    `stats` (a dict) receives how many files were cached/remuxed/transcoded/images.
+    `clip_sources` (a list) receives the source paths of each returned clip.
+    With a `spool` folder the clips are made by spool workers (see spool_clips()).
+    `remux` of None remuxes when remux_sources() allows it for `files`.
+    """
+    duplicates = duplicates or {}
+    if remux is None:
+        remux = remux_sources([duplicates.get(f, f) for f in files], size,
+                              profile_fps(profile), workers)
+    if spool:
+        return spool_clips(files, spool, image_duration, progress_cb, errors, stats, profile,
+                           size, duplicates, remux)
+    total = len(files)
+    # Repeated images are kept out of slideshows so their clip can be shared
+    jobs = group_image_runs(files, singles=set(duplicates) | set(duplicates.values()))
+    sources = [tuple(duplicates.get(f, f) for f in job) for job in jobs]
+    copies = {}
+    for i, key in enumerate(sources):
+        copies.setdefault(key, []).append(i)
+    results = [None] * len(jobs)
+    done = 0
+    workers = max(1, min(int(workers), len(copies)))
+    threads = schedule_threads(workers)
+
+    progress_cb(0, total, "Processing media")
+
+    def timed_job(key):
+        start = time.monotonic()
+        outcomes = build_job(list(key), temp_dir, image_duration, cache_dir,
+                             profile, threads, size, remux)
+        return outcomes, time.monotonic() - start
+
+    def collect(key, outcomes, seconds):
+        nonlocal done
+        for copy, i in enumerate(copies[key]):
+            results[i] = []
+            for k, (paths, result) in enumerate(outcomes):
+                # The outcome of the whole job or of its k-th file
+                paths = jobs[i] if len(outcomes) == 1 else [jobs[i][k]]
+                if isinstance(result, Exception):
+                    if errors is not None:
+                        errors.extend((path, describe_error(result)) for path in paths)
+                    continue
+                clip, dur, method = result
+                method = CLIP_DUPLICATE if copy else method
+                results[i].append((clip, dur, paths))
+                record_metric("clips", {
+                    "sources": paths, "method": method, "duration": round(dur, 3),
+                    "bytes": os.path.getsize(clip) if os.path.exists(clip) else 0,
+                    # The files of a job share its time
+                    "seconds": 0.0 if copy else round(seconds * len(paths) / len(jobs[i]), 3),
+                })
+                record_job_clip("\n".join(paths), clip, dur)
+                if stats is not None:
+                    stats[method] = stats.get(method, 0) + len(paths)
+            done += len(jobs[i])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(timed_job, key): key for key in copies}
+        pending = set(futures)
+        try:
+            # Progress is reported from the calling thread only, so the
+            # callback is free to touch the GUI
+            for fut in as_completed(futures):
+                pending.discard(fut)
+                collect(futures[fut], *fut.result())
+                progress_cb(done, total, "Processing media")
+                check_cancelled()
+        except (RenderCancelled, KeyboardInterrupt):
+            # Cancel or Ctrl-C: stop the other jobs now, not after the queue ran
+            cancel_renders()
+            pool.shutdown(wait=True, cancel_futures=True)
+            # Clips that finished meanwhile stay in the job for resume_job()
+            for fut in pending:
+                if not fut.cancelled() and fut.exception() is None:
+                    collect(futures[fut], *fut.result())
+            raise
+    # Loudness measured while encoding the clips
+    save_probe_cache()
+
+    kept = [r for job_clips in results for r in job_clips if r[1] > 0]
+    if clip_sources is not None:
+        clip_sources += [paths for _, _, paths in kept]
+    return [(clip, dur) for clip, dur, _ in kept]
+
+
+def trim_clip(clip, out_dir, seconds, profile=PROFILE_BALANCED):
+    """Re-encode the first `seconds` of a normalized clip, returns (clip, duration)"""
+    fps = profile_fps(profile)
+    frames = max(1, round(seconds * float(fps)))
+    out = os.path.join(out_dir, f"trim_{frames}_" + os.path.basename(clip))
+
+    report = run_ffmpeg([
+        "-y",
+        "-i", clip,
+        "-t", f"{frames / float(fps):.6f}",
+        "-r", fps,
+        *x264_args(profile),
+        *CLIP_AUDIO_ARGS,
+        "-movflags", "+faststart",
+        out
+    ])
+
+    return out, encoded_duration(report, fps) or get_video_duration(out)
+
+
+def build_clips_fixed(files, temp_dir, minutes, image_duration, progress_cb,
+                      workers=DEFAULT_WORKERS, errors=None, cache_dir=None, stats=None,
+                      profile=PROFILE_BALANCED, size=None, duplicates=None, loop=True,
+                      spool=None):
+    """
+    Build a clip list lasting exactly `minutes`, looping the media if needed.
+    Files are normalized lazily in batches that are just large enough (by
+    probed duration) to cover the target; the last clip is trimmed so the
+    total lands on the target within one frame. Without `loop` the list
+    ends with the media when that is shorter.
+    """
+    target_seconds = minutes * 60
+    half_frame = 0.5 / float(profile_fps(profile))
+
+    probed = probe_files([f for f in files if not f.lower().endswith(IMAGE_EXTS)], workers)
+
+    def estimate(f):
+        if f.lower().endswith(IMAGE_EXTS):
+            return image_duration
+        return probed[f]["duration"] if probed.get(f) else 0.0
+
+    normalized, covered, built = [], 0.0, 0
+    while built < len(files) and covered < target_seconds:
+        # Take just enough of the remaining files to cover what is missing
+        end, expected = built, 0.0
+        while end < len(files) and (end == built or covered + expected < target_seconds):
+            expected += estimate(files[end])
+            end += 1
+
+        # The last clip is trimmed by an encode, remuxed clips could not join it by copy
+        batch = build_clips(files[built:end], temp_dir, image_duration, progress_cb,
+                            workers, errors, cache_dir, stats, profile=profile, size=size,
+                            duplicates=duplicates, spool=spool, remux=False)
+        normalized += batch
+        covered += sum(dur for _, dur in batch)
+        built = end
+
+    if not normalized:
+        return []
+
+    # Loop over the clips that are already encoded until the target is reached
+    clips, total = [], 0.0
+    while total < target_seconds - half_frame:
+        for clip, dur in normalized:
+            remaining = target_seconds - total
+            if dur > remaining + half_frame:
+                clip, dur = trim_clip(clip, temp_dir, remaining, profile)
+            clips.append((clip, dur))
+            total += dur
+            if total >= target_seconds - half_frame:
+                break
+        if not loop:
+            break
+
+    return clips
+
+
+def format_clip_stats(stats):
+    """One line summary of how the clips of a run were produced"""
+    labels = (
+        (CLIP_TRANSCODED, "transcoded"),
+        (CLIP_REMUXED, "remuxed (no re-encode)"),
+        (CLIP_IMAGE, "images"),
+        (CLIP_CACHED, "reused from cache"),
+        (CLIP_DUPLICATE, "duplicates sharing a clip"),
+        ("dropped", "duplicates dropped"),
+        ("segments", "segments rendered in a single pass"),
+        ("appended", "appended to the live video"),
+    )
+    parts = [f"{stats[key]} {label}" for key, label in labels if stats.get(key)]
+    return ", ".join(parts)
+
+
+def write_concat_list(clips, list_file, durations=False):
+    """
+    Concat demuxer list of (path, duration) clips. With `durations` each
+    clip starts exactly where the previous one ends, even if its audio is a
+    few samples longer.
+    """
+    with open(list_file, "w", encoding="utf-8") as f:
+        for path, dur in clips:
+            # Relative paths would be taken from the folder of the list
+            path = os.path.abspath(path).replace("\\", "/").replace("'", "'\\''")
+            f.write(f"file '{path}'\n")
+            if durations:
+                f.write(f"duration {dur:.6f}\n")
+
+
+def probe_stream_signature(path):
+    """Stream parameters that must match for clips to be joined by stream copy"""
+    keys = ("codec_type", "codec_name", "profile", "width", "height", "pix_fmt",
+            "r_frame_rate", "time_base", "sample_rate", "channels", "extradata_hash")
+    return tuple(
+        tuple((k, str(st.get(k))) for k in keys)
+        for st in probe_media_cached(path)["streams"]
+    )
+
+
+def remux_sources(files, size=None, fps=TARGET_FPS, workers=DEFAULT_WORKERS):
+    """
+    True when the videos of `files` may be remuxed instead of encoded. A
+    remuxed clip keeps the stream headers of its source, so a single encoded
+    clip next to it makes the final join encode everything again: remux only
+    when every file is a conforming video with the same video headers.
+    """
+    if not files or any(f.lower().endswith(IMAGE_EXTS) for f in files):
+        return False
+    info = probe_files(files, workers)
+    if not all(is_conforming_video(info[f], size, fps) for f in info):
+        return False
+    try:
+        signatures = {
+            next(st for st in probe_stream_signature(f) if ("codec_type", "video") in st)
+            for f in info
+        }
+    except Exception:
+        return False
+    return len(signatures) == 1
+
+
+def clips_are_uniform(clips, workers=DEFAULT_WORKERS):
+    """True when every clip has identical video/audio stream parameters"""
+    paths = list(dict.fromkeys(path for path, _ in clips))
+    if not paths:
+        return False
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, int(workers))) as pool:
+            signatures = set(pool.map(probe_stream_signature, paths))
+    except Exception:
+        return False
+    finally:
+        save_probe_cache()
+    return len(signatures) == 1
+
+
+def split_renditions(video, renditions, audio=None, with_main=True):
+    """
+    Filter graph lines sending the `video` pad (and `audio` pad) to the main
+    output and to one scaled branch per ((w, h), output) in `renditions`, so
+    every size is made from the same decoded frames. Without `with_main` the
+    main output takes the stream from elsewhere and gets no branch.
+    Returns (lines, main pads, [pads of each rendition]).
+    """
+    first = 0 if with_main else 1
+    n = len(renditions) + 1
+    split = "".join(f"[sv{i}]" for i in range(1, n))
+    lines = [f"[{video}]split={n - first}" + ("[mv]" if with_main else "") + split]
+    for i, (size, _) in enumerate(renditions, 1):
+        lines.append(f"[sv{i}]{aspect_safe_filter(size)},setsar=1[rv{i}]")
+    main = ["[mv]"] if with_main else []
+    branches = [[f"[rv{i}]"] for i in range(1, n)]
+    if audio:
+        split = "".join(f"[ra{i}]" for i in range(1, n))
+        lines.append(f"[{audio}]asplit={n - first}" + ("[ma]" if with_main else "") + split)
+        main += ["[ma]"] if with_main else []
+        for i, pads in enumerate(branches, 1):
+            pads.append(f"[ra{i}]")
+    return lines, main, branches
+
+
+def rendition_output_args(renditions, branches, audio_args, encoder_args):
+    """Output arguments writing each rendition from its pads of split_renditions()"""
+    args = []
+    for (_, output), pads in zip(renditions, branches):
+        for pad in pads:
+            args += ["-map", pad]
+        args += [*audio_args, "-r", TARGET_FPS, *encoder_args, "-movflags", "+faststart", output]
+    return args
+
+
+def plan_final_chunks(clips, parts):
+    """
+    Split `clips` into at most `parts` time-contiguous runs of about equal
+    length, at least FINAL_CHUNK_MIN_SECONDS each. Runs only start at a clip
+    with the same kinds of streams as the first clip, so once encoded they
+    join by stream copy exactly like one encode of the whole list would.
+    """
+    total = sum(dur for _, dur in clips)
+    parts = max(1, min(int(parts), int(total // FINAL_CHUNK_MIN_SECONDS)))
+    if parts == 1:
+        return [clips]
+
+    def layout(path):
+        return tuple(st["codec_type"] for st in probe_media_cached(path)["streams"])
+
+    first = layout(clips[0][0])
+    runs, start, elapsed, run_start = [], 0, 0.0, 0.0
+    for i, (clip, dur) in enumerate(clips):
+        if (len(runs) < parts - 1
+                and elapsed >= total * (len(runs) + 1) / parts
+                and elapsed - run_start >= FINAL_CHUNK_MIN_SECONDS
+                and layout(clip) == first):
+            runs.append(clips[start:i])
+            start, run_start = i, elapsed
+        elapsed += dur
+    runs.append(clips[start:])
+    return runs
+
+
+def final_concat(list_file, output, clips=None, profile=PROFILE_BALANCED, renditions=(),
+                 workers=1):
+    """
+    Join the clips listed in `list_file` into `output`.
+    When `clips` is given and they all share the same stream parameters
+    the streams are copied instead of re-encoded. Otherwise a long list is
+    encoded in up to `workers` parallel chunks split at clip boundaries (see
+    plan_final_chunks) that are joined by stream copy.
+    Returns "copy", "parallel" or "encode".
+    `renditions` lists ((w, h), path) videos scaled down from the same decode
+    of the clips by the same FFmpeg process.
+    """
+    def concat_args(list_path, out, sizes, main_args, audio_args, threads=0):
+        args = ["-y", "-f", "concat", "-safe", "0", "-i", list_path]
+        if sizes:
+            # The joined video itself is copied or encoded straight from the input
+            lines, _, branches = split_renditions("0:v:0", sizes, with_main=False)
+            args += ["-filter_complex", ";".join(lines)]
+        args += ["-map", "0:v:0", "-map", "0:a:0?", *main_args, "-movflags", "+faststart", out]
+        if sizes:
+            args += rendition_output_args(sizes, branches, ["-map", "0:a:0?", *audio_args],
+                                          x264_args(profile, threads))
+        return args
+
+    if clips and clips_are_uniform(clips):
+        # The video of a clip starts after the AAC priming delay; with the clip
+        # lengths each clip starts one frame after the last frame of the previous
+        write_concat_list(clips, list_file, durations=True)
+        try:
+            run_ffmpeg(concat_args(list_file, output, renditions, ["-c", "copy"], ["-c:a", "copy"]))
+            return "copy"
+        except subprocess.CalledProcessError:
+            pass  # Fall back to a full encode below
+
+    fps = profile_fps(profile)
+    runs = plan_final_chunks(clips, workers) if clips else []
+    if len(runs) > 1:
+        threads = schedule_threads(len(runs))
+        outputs = [output] + [path for _, path in renditions]
+        # Next to the output, the chunks are as large as the video itself
+        with tempfile.TemporaryDirectory(prefix=".autofolder_",
+                                         dir=os.path.dirname(os.path.abspath(output))) as temp_dir:
+            def encode_run(i):
+                run_list = os.path.join(temp_dir, f"run_{i:04d}.txt")
+                write_concat_list(runs[i], run_list)
+                parts = [os.path.join(temp_dir, f"run_{i:04d}_{r}.mp4") for r in range(len(outputs))]
+                sizes = [(size, part) for (size, _), part in zip(renditions, parts[1:])]
+                # Cut on the last frame of the run so no stream runs past the seam
+                frames = max(1, round(sum(dur for _, dur in runs[i]) * float(fps)))
+                duration = frames / float(fps)
+                length = ["-t", f"{duration:.6f}"]
+                run_ffmpeg(concat_args(run_list, parts[0], sizes,
+                                       [*x264_args(profile, threads), "-r", fps, *length],
+                                       [*CLIP_AUDIO_ARGS, *length], threads))
+                return [(part, duration) for part in parts]
+
+            try:
+                with ThreadPoolExecutor(max_workers=len(runs)) as pool:
+                    encoded = list(pool.map(encode_run, range(len(runs))))
+                for r, out in enumerate(outputs):
+                    parts = [run[r] for run in encoded]
+                    parts_list = os.path.join(temp_dir, f"parts_{r}.txt")
+                    write_concat_list(parts, parts_list, durations=True)
+                    final_concat(parts_list, out, parts, profile)
+                return "parallel"
+            except subprocess.CalledProcessError:
+                pass  # Encode the whole list in one process below
+
+    run_ffmpeg(concat_args(list_file, output, renditions,
+                           [*x264_args(profile), "-r", fps], CLIP_AUDIO_ARGS))
+    return "encode"
+
+
+# ================= SINGLE PASS ENGINE =================
+# Renders straight from the sources with one filter graph per chunk of
+# inputs instead of writing a normalized clip per file.
+
+
+def plan_segments(files, image_duration, probed, minutes=None, fps=TARGET_FPS, loop=True):
+    """
+    List of (path, seconds, has_audio) making up the output timeline.
+    With `minutes`, media is looped and the last segment is shortened so
+    the timeline lasts exactly that long; without `loop` it ends with the
+    media when that is shorter.
+    """
+    media = []
+    for f in files:
+        if f.lower().endswith(IMAGE_EXTS):
+            media.append((f, float(image_duration), False))
+        elif probed[f]["duration"] > 0:
+            media.append((f, probed[f]["duration"], probed[f]["has_audio"]))
+
+    if minutes is None or not media:
+        return media
+
+    target_seconds = minutes * 60
+    half_frame = 0.5 / float(fps)
+    segments, total = [], 0.0
+    while total < target_seconds - half_frame:
+        for path, dur, has_audio in media:
+            dur = min(dur, target_seconds - total)
+            segments.append((path, dur, has_audio))
+            total += dur
+            if total >= target_seconds - half_frame:
+                break
+        if not loop:
+            break
+    return segments
+
+
+def direct_render_args(segments, output, with_audio, filter_script, encoder_args=None,
+                       size=None, renditions=(), fps=TARGET_FPS):
+    """
+    FFmpeg arguments rendering `segments` into `output` (of `size`, at `fps`)
+    with one filter graph, `encoder_args` defaults to x264_args(). `renditions`
+    lists ((w, h), path) videos split off the same graph and scaled down.
+    """
+    args, graph, labels = ["-y"], [], ""
+
+    for k, (path, dur, has_audio) in enumerate(segments):
+        if path.lower().endswith(IMAGE_EXTS):
+            args += ["-i", path]
+            graph.append(f"[{k}:v]{still_image_filter(dur, size, fps)}[v{k}]")
+        else:
+            args += ["-err_detect", "ignore_err", "-t", f"{dur:.6f}", "-i", path]
+            graph.append(
+                f"[{k}:v]{aspect_safe_filter(size)},setsar=1,fps={fps},format=yuv420p[v{k}]"
+            )
+        labels += f"[v{k}]"
+        if with_audio:
+            # Silence for images and silent videos keeps audio and video in step
+            source = f"[{k}:a]{loudnorm_filter(source_loudness(path)[1])},apad" \
+                if has_audio else SILENCE_SOURCE
+            graph.append(f"{source},atrim=duration={dur:.6f}[a{k}]")
+            labels += f"[a{k}]"
+
+    graph.append(
+        f"{labels}concat=n={len(segments)}:v=1:a={1 if with_audio else 0}"
+        + ("[v][a]" if with_audio else "[v]")
+    )
+    main = ["[v]", "[a]"] if with_audio else ["[v]"]
+    if renditions:
+        lines, main, branches = split_renditions("v", renditions, "a" if with_audio else None)
+        graph += lines
+    with open(filter_script, "w", encoding="utf-8") as f:
+        f.write(";\n".join(graph))
+
+    encoder_args = x264_args() if encoder_args is None else encoder_args
+    audio_args = CLIP_AUDIO_ARGS if with_audio else []
+    args += ["-filter_complex_script", filter_script]
+    for pad in main:
+        args += ["-map", pad]
+    args += [*audio_args, "-r", fps, *encoder_args, "-movflags", "+faststart", output]
+    if renditions:
+        args += rendition_output_args(renditions, branches, audio_args, encoder_args)
+    return args
+
+
+def render_direct(files, output, image_duration, progress_cb, minutes=None,
+                  workers=DEFAULT_WORKERS, errors=None, chunk_size=DIRECT_CHUNK_SIZE,
+                  profile=PROFILE_BALANCED, work_dir=None, size=None, renditions=(), loop=True):
+    """
+    Render `files` into `output` without intermediate per-file clips.
+    Inputs are split in chunks of `chunk_size`; each chunk is one FFmpeg
+    process and the chunks are joined by stream copy. Files that cannot be
+    read are skipped and reported in `errors`. Returns the number of segments.
+    Chunks finished in `work_dir` by an interrupted render are reused.
+    `output` is `size`; each ((w, h), path) of `renditions` is scaled down
+    inside the same FFmpeg processes, so every source is decoded once.
+    `loop` as in plan_segments().
+    """
+    fps = profile_fps(profile)
+    with metrics_stage("probe"):
+        probed = probe_files(files, workers)
+    usable = []
+    for f in files:
+        if probed.get(f) and probed[f]["width"] > 0:
+            usable.append(f)
+        elif errors is not None:
+            errors.append((f, "Unreadable or no video stream"))
+
+    segments = plan_segments(usable, image_duration, probed, minutes, fps, loop)
+    if not segments:
+        return 0
+
+    with metrics_stage("loudness"):
+        measure_files([path for path, _, has_audio in segments if has_audio], workers)
+    chunks = [segments[i:i + chunk_size] for i in range(0, len(segments), chunk_size)]
+
+    if len(chunks) == 1:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            progress_cb(0, 1, "Rendering")
+            with metrics_stage("render"):
+                run_ffmpeg(direct_render_args(
+                    chunks[0], output, True, os.path.join(temp_dir, "graph.txt"),
+                    x264_args(profile), size, renditions, fps
+                ))
+            progress_cb(1, 1, "Rendering")
+        return len(segments)
+
+    workers = max(1, min(int(workers), len(chunks)))
+    encoder_args = x264_args(profile, schedule_threads(workers))
+
+    with (tempfile.TemporaryDirectory() if work_dir is None else nullcontext(work_dir)) as temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+        sizes = [size] + [rendition_size for rendition_size, _ in renditions]
+
+        def render_chunk(i):
+            # Named after its content, a finished chunk is only ever renamed into place
+            ident = json.dumps([chunks[i], LOUDNESS_TARGET, encoder_args, sizes, fps])
+            name = f"chunk_{i:04d}_{hashlib.sha1(ident.encode('utf-8')).hexdigest()[:12]}"
+            # One part per size: the chunk itself, then _1, _2... for the renditions
+            outs = [os.path.join(temp_dir, name + (f"_{r}" if r else "") + ".mp4")
+                    for r in range(len(sizes))]
+            duration = sum(dur for _, dur, _ in chunks[i])
+            if not all(os.path.isfile(out) for out in outs):
+                tmps = [out[:-len(".mp4")] + ".partial.mp4" for out in outs]
+                run_ffmpeg(direct_render_args(
+                    chunks[i], tmps[0], True, os.path.join(temp_dir, f"graph_{i:04d}.txt"),
+                    encoder_args, size, list(zip(sizes[1:], tmps[1:])), fps
+                ))
+                # The chunk itself last: it marks all of its parts as finished
+                for tmp, out in reversed(list(zip(tmps, outs))):
+                    os.replace(tmp, out)
+            record_job_clip(f"chunk {i}", outs[0], duration)
+            return [(out, duration) for out in outs]
+
+        parts = [None] * len(chunks)
+        done = 0
+        progress_cb(0, len(chunks), "Rendering")
+        with metrics_stage("render"), ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(render_chunk, i): i for i in range(len(chunks))}
+            for fut in as_completed(futures):
+                parts[futures[fut]] = fut.result()
+                done += 1
+                progress_cb(done, len(chunks), "Rendering")
+
+        with metrics_stage("concat"):
+            outputs = [output] + [path for _, path in renditions]
+            for r, out in enumerate(outputs):
+                list_file = os.path.join(temp_dir, f"chunks_{r}.txt")
+                write_concat_list([chunk[r] for chunk in parts], list_file)
+                final_concat(list_file, out, [chunk[r] for chunk in parts], profile)
+
+    return len(segments)
+
+
+# ================= INCREMENTAL OUTPUT =================
+# The live video is kept as numbered segments and a manifest in the output
+# folder. A render only encodes the files added since the previous one and
+# joins all segments again by stream copy.
+INCREMENTAL_DIR = ".autofolder_live"
+INCREMENTAL_OUTPUT = "combined_live.mp4"
+INCREMENTAL_VERSION = 2
+# Orders that put new files anywhere: the live video appends them as they arrive
+ARRIVAL_ORDERS = (ORDER_DATE_NEW, ORDER_RANDOM)
+
+
+def incremental_settings(image_duration, profile=PROFILE_BALANCED):
+    """Settings the segments depend on, a change starts the live video over"""
+    # Lists, as they come back from the JSON manifest
+    return {
+        "profile": list(ENCODE_PROFILES[profile]),
+        "v": INCREMENTAL_VERSION,
+        "clip": CLIP_CACHE_VERSION,
+        "w": TARGET_W,
+        "h": TARGET_H,
+        "fps": TARGET_FPS,
+        "filter": ASPECT_SAFE_FILTER,
+        "image_duration": float(image_duration),
+    }
+
+
+def load_incremental_state(state_dir, image_duration, profile=PROFILE_BALANCED):
+    """
+    Manifest of the live video: `sources` as [path, size, mtime] in the order
+    they were appended, `segments` as {"file", "duration"} and `video`, the
+    stream signature segments need for their video to be copied.
+    """
+    settings = incremental_settings(image_duration, profile)
+    try:
+        with open(os.path.join(state_dir, "manifest.json"), encoding="utf-8") as f:
+            state = json.load(f)
+        if state["settings"] == settings:
+            return state
+    except Exception:
+        pass
+    return {"settings": settings, "sources": [], "segments": [], "video": None}
+
+
+def save_incremental_state(state_dir, state):
+    path = os.path.join(state_dir, "manifest.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def appended_files(state, files, arrival_order=False):
+    """
+    Files to append to the live video, or None when it must be rebuilt because
+    a source changed or a new file sorts before one that is already in it.
+    With `arrival_order` the order of `files` only applies to the new files,
+    which are appended after the others wherever they sort.
+    Sources that were removed (e.g. deleted after combining) stay in the video.
+    """
+    known = {path: (size, mtime) for path, size, mtime in state["sources"]}
+    present = [f for f in files if f in known]
+    new = [f for f in files if f not in known]
+    if not arrival_order:
+        if files != present + new:
+            return None
+        present_set = set(present)
+        if present != [path for path, _, _ in state["sources"] if path in present_set]:
+            return None
+    try:
+        for f in present:
+            st = os.stat(f)
+            if (st.st_size, st.st_mtime_ns) != tuple(known[f]):
+                return None
+    except OSError:
+        return None
+    return new
+
+
+def video_signature(clip):
+    """Stream signature of the video stream of a clip, as stored in the manifest"""
+    for stream in probe_stream_signature(clip):
+        if ("codec_type", "video") in stream:
+            return json.dumps(stream)
+    return None
+
+
+def make_segment(clip, duration, out, copy_video, profile=PROFILE_BALANCED):
+    """
+    Write a clip as a live video segment: the video (copied when it matches
+    the other segments) and AAC audio, silence when the clip has none, so
+    every segment has the same streams. Audio that is already the uniform
+    clip track (CLIP_AUDIO_ARGS) is copied.
+    """
+    info = probe_media_cached(clip)
+    video = ["-c:v", "copy"] if copy_video else ["-r", TARGET_FPS, *x264_args(profile)]
+    if (info["audio_codec"], info["sample_rate"], info["channels"]) == ("aac", 48000, 2):
+        streams = ["-map", "0:v:0", "-map", "0:a:0", *video, "-c:a", "copy",
+                   "-t", f"{duration:.6f}"]
+    else:
+        source = f"[0:a]{AUDIO_FORMAT_FILTER},apad" if info["has_audio"] else SILENCE_SOURCE
+        streams = ["-filter_complex", f"{source},atrim=duration={duration:.6f}[a]",
+                   "-map", "0:v:0", "-map", "[a]", *video, *CLIP_AUDIO_ARGS]
+
+    run_ffmpeg([
+        "-y",
+        "-i", clip,
+        *streams,
+        "-movflags", "+faststart",
+        out
+    ])
+
+
+def render_incremental(files, output_folder, image_duration, progress_cb,
+                       workers=DEFAULT_WORKERS, errors=None, stats=None,
+                       profile=PROFILE_BALANCED, arrival_order=False):
+    """
+    Keep output_folder/combined_live.mp4 up to date with `files`: only files
+    that are new since the last call are normalized and appended. Changed or
+    reordered sources start the live video over, unless `arrival_order`
+    appends new files in the order they arrive (see appended_files()).
+    Returns the output path, or None when there is nothing to show.
+    """
+    state_dir = os.path.join(output_folder, INCREMENTAL_DIR)
+    os.makedirs(state_dir, exist_ok=True)
+    out_video = os.path.join(output_folder, INCREMENTAL_OUTPUT)
+
+    state = load_incremental_state(state_dir, image_duration, profile)
+    new = appended_files(state, files, arrival_order)
+    if new is None:
+        for seg in state["segments"]:
+            try:
+                os.remove(os.path.join(state_dir, seg["file"]))
+            except OSError:
+                pass
+        state = {"settings": state["settings"], "sources": [], "segments": [], "video": None}
+        new = files
+
+    if not new and os.path.isfile(out_video):
+        progress_cb(len(files), len(files), "Up to date")
+        return out_video if state["segments"] else None
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        clip_sources = []
+        with metrics_stage("clips"):
+            # Segments of later runs must join these by copy, so nothing is remuxed
+            clips = build_clips(new, temp_dir, image_duration, progress_cb,
+                                workers, errors, CLIP_CACHE_DIR, stats, clip_sources, profile,
+                                remux=False)
+
+        for i, ((clip, dur), paths) in enumerate(zip(clips, clip_sources)):
+            check_cancelled()
+            progress_cb(i, len(clips), "Appending")
+            copy_video = state["video"] in (None, video_signature(clip))
+            name = f"{len(state['segments']):06d}.mp4"
+            segment = os.path.join(state_dir, name)
+            with metrics_stage("segments"):
+                make_segment(clip, dur, segment, copy_video, profile)
+            if state["video"] is None:
+                state["video"] = video_signature(segment)
+            state["segments"].append({"file": name, "duration": dur})
+            if stats is not None:
+                stats["appended"] = stats.get("appended", 0) + len(paths)
+
+    # Files that failed are recorded too, they are reported once and not retried
+    for f in new:
+        try:
+            st = os.stat(f)
+            state["sources"].append([f, st.st_size, st.st_mtime_ns])
+        except OSError:
+            pass
+    save_incremental_state(state_dir, state)
+
+    if not state["segments"]:
+        return None
+
+    segments = [(os.path.join(state_dir, seg["file"]), seg["duration"])
+                for seg in state["segments"]]
+    list_file = os.path.join(state_dir, "segments.txt")
+    tmp_video = os.path.join(output_folder, ".combined_live.tmp.mp4")
+
+    progress_cb(len(files), len(files), "Combining")
+    write_concat_list(segments, list_file)
+    with metrics_stage("concat"):
+        final_concat(list_file, tmp_video, segments, profile)
+    os.replace(tmp_video, out_video)
+    prune_clip_cache(CLIP_CACHE_DIR)
+
+    return out_video
+
+
+# ================= RESUMABLE JOBS =================
+# Every render keeps a manifest in output_folder/.autofolder_jobs/<id>.json
+# with its inputs, settings and finished clips, and its intermediate files in
+# a work folder next to it. Both are removed when the render succeeds, so an
+# interrupted render (crash, reboot, Cancel) can be resumed from them.
+JOBS_DIR = ".autofolder_jobs"
+JOB_VERSION = 1
+# Seconds between manifest writes while clips finish
+JOB_SAVE_INTERVAL = 1.0
+# RenderJob of the render in progress, see render_files()
+_job = None
+
+
+class RenderJob:
+    """Manifest of one render, saved while it runs so it can be resumed"""
+
+    def __init__(self, output_folder, job_id, files, settings, done=None, status="running"):
+        # Its paths end up in concat lists, resolved against the list's folder
+        self.output_folder = os.path.abspath(output_folder)
+        self.id = job_id
+        self.files = files
+        self.settings = settings
+        self.done = done or {}
+        self.status = status
+        self.pid = None
+        self.lock = threading.Lock()
+        self.saved = 0.0
+
+    @property
+    def manifest(self):
+        return os.path.join(self.output_folder, JOBS_DIR, self.id + ".json")
+
+    @property
+    def work_dir(self):
+        return os.path.join(self.output_folder, JOBS_DIR, self.id)
+
+    @property
+    def output(self):
+        return os.path.join(self.output_folder, f"combined_{self.id}.mp4")
+
+    @classmethod
+    def load(cls, manifest):
+        with open(manifest, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != JOB_VERSION:
+            raise ValueError(f"Unsupported job manifest {manifest}")
+        output_folder = os.path.dirname(os.path.dirname(os.path.abspath(manifest)))
+        job = cls(output_folder, data["id"], data["files"], data["settings"],
+                  data["done"], data["status"])
+        job.pid = data["pid"]
+        return job
+
+    def save(self, status=None):
+        with self.lock:
+            if status:
+                self.status = status
+            data = {
+                "version": JOB_VERSION,
+                "id": self.id,
+                "status": self.status,
+                "pid": os.getpid(),
+                "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "files": self.files,
+                "settings": self.settings,
+                "done": dict(self.done),
+            }
+            self.saved = time.monotonic()
+        os.makedirs(os.path.dirname(self.manifest), exist_ok=True)
+        tmp = f"{self.manifest}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.manifest)
+
+    def clip_done(self, key, clip, duration):
+        with self.lock:
+            self.done[key] = {"clip": clip, "duration": duration,
+                              "bytes": os.path.getsize(clip)}
+            due = time.monotonic() - self.saved >= JOB_SAVE_INTERVAL
+        if due:
+            self.save()
+
+    def verify(self):
+        """
+        Drop finished clips that are missing, changed size or no longer decode
+        to their recorded duration, so they are encoded again. Returns the
+        number of clips kept.
+        """
+        tolerance = 1.5 / float(TARGET_FPS)
+        for key, entry in list(self.done.items()):
+            clip = entry["clip"]
+            try:
+                ok = (os.path.getsize(clip) == entry["bytes"]
+                      and abs(probe_media(clip)["duration"] - entry["duration"]) <= tolerance)
+            except Exception:
+                ok = False
+            if not ok:
+                del self.done[key]
+                # A cached clip is removed together with its metadata
+                for path in (clip, os.path.splitext(clip)[0] + ".json"):
+                    if os.path.isfile(path):
+                        os.remove(path)
+        return len(self.done)
+
+    def discard(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+        try:
+            os.remove(self.manifest)
+            os.rmdir(os.path.dirname(self.manifest))  # Only when no other job is left
+        except OSError:
+            pass
+
+
+def record_job_clip(key, clip, duration):
+    """Mark a clip of the render in progress as finished, if a job is recorded"""
+    job = _job
+    if job is not None:
+        job.clip_done(key, clip, duration)
+
+
+def _process_alive(pid):
+    if not pid or pid == os.getpid() or sys.platform.startswith("win"):
+        # os.kill() would terminate the process on Windows
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def find_resumable_jobs(output_folder):
+    """Interrupted renders of an output folder, newest first"""
+    jobs = []
+    try:
+        names = os.listdir(os.path.join(output_folder, JOBS_DIR))
+    except OSError:
+        return jobs
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        try:
+            job = RenderJob.load(os.path.join(output_folder, JOBS_DIR, name))
+        except Exception:
+            continue
+        # Still being rendered by another process
+        if job.status == "running" and _process_alive(job.pid):
+            continue
+        jobs.append(job)
+    return sorted(jobs, key=lambda job: job.id, reverse=True)
+
+
+def resume_job(job, progress_cb, errors=None, stats=None):
+    """Render an interrupted job again, reusing the clips it finished"""
+    job.verify()
+    s = job.settings
+    return render_files(job.files, job.output_folder, s["image_duration"], progress_cb,
+                        s["minutes"], s["workers"], s["engine"], errors, stats,
+                        s["incremental"], s["profile"], s.get("renditions"),
+                        s.get("duplicates", DUPLICATES_KEEP), s.get("spool"), job=job)
+
+
+# ================= SHARED SPOOL =================
+# Clips can be made by worker processes on any number of hosts sharing a
+# spool folder (the sources must have the same absolute path on every host):
+#   tasks/<key>.json    a source file to normalize, written by the render
+#   leases/<key>.lease  the worker on it, kept fresh while it works
+#   done/<key>.json     result of the task: the clip and its duration, or the error
+#   clips/              the clips, stored like the clip cache
+# <key> is the clip cache key of the source and its settings, so doing a task
+# twice (after its lease expired, or for two renders) makes the same clip.
+SPOOL_LEASE_SECONDS = 60
+SPOOL_POLL_SECONDS = 1.0
+# Results and leases older than this are removed by the next render using the spool
+SPOOL_MAX_AGE = 7 * 24 * 60 * 60
+SPOOL_DIRS = ("tasks", "leases", "done", "clips")
+
+
+def spool_path(spool, kind, key=None):
+    """Folder `kind` of a spool (one of SPOOL_DIRS), or the file of task `key` in it"""
+    folder = os.path.join(spool, kind)
+    if key is None:
+        return folder
+    return os.path.join(folder, key + (".lease" if kind == "leases" else ".json"))
+
+
+def write_json_atomic(path, data):
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def read_json(path):
+    """Contents of a JSON file, None when it is missing or incomplete"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def claim_task(spool, key, worker):
+    """
+    Take the lease of a task for `worker`, taking over a lease that was not
+    renewed for SPOOL_LEASE_SECONDS (its worker died). Returns True when the
+    task is ours. A race can at worst make two workers do the same task.
+    """
+    lease = spool_path(spool, "leases", key)
+    for _ in range(2):
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                expired = time.time() - os.stat(lease).st_mtime > SPOOL_LEASE_SECONDS
+            except FileNotFoundError:
+                continue  # Released meanwhile
+            if not expired:
+                return False
+            # Of the workers that saw it expire, only one can rename it away
+            stale = f"{lease}.{hashlib.sha1(worker.encode('utf-8')).hexdigest()[:8]}.expired"
+            try:
+                os.rename(lease, stale)
+                os.remove(stale)
+            except OSError:
+                return False
+            continue
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"worker": worker, "claimed": time.time()}, f)
+        return True
+    return False
+
+
+def lease_owner(spool, key):
+    return (read_json(spool_path(spool, "leases", key)) or {}).get("worker")
+
+
+def renew_lease(spool, key, worker):
+    """Keep the lease of a task fresh, False once another worker took it over"""
+    if lease_owner(spool, key) != worker:
+        return False
+    try:
+        os.utime(spool_path(spool, "leases", key))
+        return True
+    except OSError:
+        return False
+
+
+def release_lease(spool, key, worker):
+    if lease_owner(spool, key) == worker:
+        try:
+            os.remove(spool_path(spool, "leases", key))
+        except OSError:
+            pass
+
+
+def next_task(spool, worker):
+    """Claim the oldest task without a result, returns its key or None"""
+    tasks = []
+    try:
+        for e in os.scandir(spool_path(spool, "tasks")):
+            if e.name.endswith(".json"):
+                try:
+                    tasks.append((e.stat().st_mtime, e.name[:-len(".json")]))
+                except FileNotFoundError:
+                    pass
+    except FileNotFoundError:
+        return None
+
+    for _, key in sorted(tasks):
+        if os.path.exists(spool_path(spool, "done", key)):
+            # Queued again by a render that just missed the result
+            try:
+                os.remove(spool_path(spool, "tasks", key))
+            except OSError:
+                pass
+            continue
+        if not claim_task(spool, key, worker):
+            continue
+        # Finished by another worker between the check and the claim
+        if os.path.exists(spool_path(spool, "done", key)):
+            release_lease(spool, key, worker)
+            continue
+        return key
+    return None
+
+
+def run_spool_task(spool, key, worker, threads=0):
+    """
+    Make the clip of a claimed task and write its result, renewing the lease
+    meanwhile. Returns the result, None when the task no longer exists.
+    """
+    task = read_json(spool_path(spool, "tasks", key))
+    if task is None:
+        return None
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(SPOOL_LEASE_SECONDS / 4):
+            if not renew_lease(spool, key, worker):
+                return  # Taken over; both workers make the same clip
+
+    renewer = threading.Thread(target=heartbeat, daemon=True)
+    renewer.start()
+    clips_dir = spool_path(spool, "clips")
+    start = time.monotonic()
+    try:
+        clip, duration, method = build_clip(
+            task["path"], clips_dir, task["image_duration"], clips_dir, task["profile"],
+            threads, tuple(task["size"]) if task["size"] else None, task.get("remux", False)
+        )
+        # Relative, the spool may be mounted elsewhere on the render host
+        result = {"clip": os.path.relpath(clip, spool), "duration": duration, "method": method,
+                  "seconds": round(time.monotonic() - start, 3)}
+    except RenderCancelled:
+        raise
+    except Exception as e:
+        result = {"error": describe_error(e)}
+    finally:
+        stop.set()
+        renewer.join()
+
+    result.update(worker=worker, finished=time.time())
+    write_json_atomic(spool_path(spool, "done", key), result)
+    try:
+        os.remove(spool_path(spool, "tasks", key))
+    except OSError:
+        pass
+    return result
+
+
+def run_spool_worker(spool, workers=1, idle_exit=None, on_result=None):
+    """
+    Do the tasks of `spool` with `workers` threads until interrupted, or until
+    no task was found for `idle_exit` seconds. `on_result(key, result)` is
+    called for every finished task. Returns the number of tasks done.
+    """
+    spool = os.path.abspath(spool)
+    for kind in SPOOL_DIRS:
+        os.makedirs(spool_path(spool, kind), exist_ok=True)
+    threads = schedule_threads(workers)
+    host = f"{socket.gethostname()}:{os.getpid()}"
+    counter = {"done": 0}
+    lock = threading.Lock()
+
+    def loop(n):
+        worker = f"{host}:{n}"
+        idle_since = time.monotonic()
+        try:
+            while True:
+                check_cancelled()
+                key = next_task(spool, worker)
+                if key is None:
+                    if idle_exit is not None and time.monotonic() - idle_since >= idle_exit:
+                        return
+                    time.sleep(SPOOL_POLL_SECONDS)
+                    continue
+                try:
+                    result = run_spool_task(spool, key, worker, threads)
+                finally:
+                    release_lease(spool, key, worker)
+                if result is not None:
+                    with lock:
+                        counter["done"] += 1
+                        if on_result:
+                            on_result(key, result)
+                idle_since = time.monotonic()
+        except RenderCancelled:
+            pass
+
+    runners = [threading.Thread(target=loop, args=(n,), daemon=True) for n in range(workers)]
+    for t in runners:
+        t.start()
+    try:
+        # Polled: an interrupted join would leave the threads running
+        while any(t.is_alive() for t in runners):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        cancel_renders()
+        for t in runners:
+            t.join()
+        raise
+    return counter["done"]
+
+
+def prune_spool(spool):
+    """Remove results and leases older than SPOOL_MAX_AGE, and evict old clips"""
+    cutoff = time.time() - SPOOL_MAX_AGE
+    for kind in ("done", "leases"):
+        try:
+            entries = list(os.scandir(spool_path(spool, kind)))
+        except FileNotFoundError:
+            continue
+        for e in entries:
+            try:
+                if e.stat().st_mtime < cutoff:
+                    os.remove(e.path)
+            except OSError:
+                pass
+    prune_clip_cache(spool_path(spool, "clips"))
+
+
+def spool_clips(files, spool, image_duration, progress_cb, errors=None, stats=None,
+                profile=PROFILE_BALANCED, size=None, duplicates=None, remux=False):
+    """
+    Build the clips of `files` like build_clips(), but by queuing a task per
+    source file in `spool` and waiting for run_spool_worker() processes to
+    do them. Clips made for earlier renders are reused; their failures are
+    tried again, they may come from a worker that could not reach the file.
+    Returns [(clip, duration)] in the order of `files`.
+    """
+    # Clip paths are joined to it and written to concat lists
+    spool = os.path.abspath(spool)
+    for kind in SPOOL_DIRS:
+        os.makedirs(spool_path(spool, kind), exist_ok=True)
+    prune_spool(spool)
+    duplicates = duplicates or {}
+
+    keys, reused = {}, set()
+    for f in files:
+        source = duplicates.get(f, f)
+        if source in keys:
+            continue
+        try:
+            key = keys[source] = clip_cache_key(source, image_duration, profile, size, remux)
+        except OSError as e:
+            keys[source] = e
+            continue
+        done = spool_path(spool, "done", key)
+        result = read_json(done)
+        if result and "error" not in result and os.path.exists(os.path.join(spool, result["clip"])):
+            reused.add(key)
+            continue
+        if result:
+            # Failed or its clip was evicted, make it again
+            try:
+                os.remove(done)
+            except FileNotFoundError:
+                pass  # Removed by another render
+        if os.path.exists(spool_path(spool, "tasks", key)):
+            continue  # Queued by another render
+        write_json_atomic(spool_path(spool, "tasks", key), {
+            "path": os.path.abspath(source),
+            "image_duration": image_duration,
+            "profile": profile,
+            "size": list(size) if size else None,
+            "remux": remux,
+            "submitted": time.time(),
+        })
+
+    results = {}
+    pending = {key for key in keys.values() if isinstance(key, str)}
+    finished = -1
+    while True:
+        for key in list(pending):
+            result = read_json(spool_path(spool, "done", key))
+            if result is not None:
+                results[key] = result
+                pending.discard(key)
+        count = sum(1 for f in files if keys[duplicates.get(f, f)] not in pending)
+        if count != finished:
+            finished = count
+            progress_cb(finished, len(files), "Waiting for workers")
+        if not pending:
+            break
+        check_cancelled()
+        time.sleep(SPOOL_POLL_SECONDS)
+
+    clips = []
+    for f in files:
+        key = keys[duplicates.get(f, f)]
+        result = results[key] if isinstance(key, str) else {"error": describe_error(key)}
+        if "error" in result:
+            if errors is not None:
+                errors.append((f, result["error"]))
+            continue
+        clip = os.path.join(spool, result["clip"])
+        method = (CLIP_DUPLICATE if f in duplicates
+                  else CLIP_CACHED if key in reused else result["method"])
+        record_metric("clips", {
+            "sources": [f], "method": method, "duration": round(result["duration"], 3),
+            "bytes": os.path.getsize(clip) if os.path.exists(clip) else 0,
+            "seconds": 0.0 if method in (CLIP_DUPLICATE, CLIP_CACHED) else result.get("seconds", 0.0),
+            "worker": result["worker"],
+        })
+        if stats is not None:
+            stats[method] = stats.get(method, 0) + 1
+        if result["duration"] > 0:
+            clips.append((clip, result["duration"]))
+    return clips
+
+
+# ================= RENDER JOB =================
+
+def render_clips(files, out_video, list_file, image_duration, progress_cb, minutes=None,
+                 workers=DEFAULT_WORKERS, errors=None, stats=None, profile=PROFILE_BALANCED,
+                 work_dir=None, size=None, renditions=(), duplicates=None, loop=True,
+                 use_cache=True, spool=None):
+    """
+    Render with the per-file clip engine, returns the output path or None.
+    Without the clip cache (or `use_cache`), clips are cached in `work_dir`
+    so that an interrupted render can reuse them. Clips are made once at
+    `size` and shared by the ((w, h), path) `renditions`, and once per
+    content for `duplicates` (see build_clips()). `loop` as in
+    build_clips_fixed(). With a `spool` folder the clips are made by spool
+    workers, possibly on other hosts.
+    """
+    with (tempfile.TemporaryDirectory() if work_dir is None else nullcontext(work_dir)) as temp_dir:
+        os.makedirs(temp_dir, exist_ok=True)
+        cache_dir = (CLIP_CACHE_DIR if use_cache else None) or \
+            (os.path.join(work_dir, "clips") if work_dir else None)
+        with metrics_stage("clips"):
+            clips = (
+                build_clips(files, temp_dir, image_duration, progress_cb,
+                            workers, errors, cache_dir, stats, profile=profile, size=size,
+                            duplicates=duplicates, spool=spool)
+                if minutes is None
+                else build_clips_fixed(files, temp_dir, minutes, image_duration, progress_cb,
+                                       workers, errors, cache_dir, stats, profile, size,
+                                       duplicates, loop, spool)
+            )
+        if not clips:
+            return None
+
+        progress_cb(len(files), len(files), "Combining")
+        write_concat_list(clips, list_file)
+        with metrics_stage("concat"):
+            final_concat(list_file, out_video, clips, profile, renditions, workers)
+        prune_clip_cache(CLIP_CACHE_DIR)
+
+    return out_video
+
+
+def render_files(files, output_folder, image_duration, progress_cb, minutes=None,
+                 workers=DEFAULT_WORKERS, engine=ENGINE_CLIPS, errors=None, stats=None,
+                 incremental=False, profile=PROFILE_BALANCED, renditions=None,
+                 duplicates=DUPLICATES_KEEP, spool=None, job=None, arrival_order=False):
+    """
+    Combine `files` into output_folder/combined_<timestamp>.mp4 without any GUI.
+    `minutes` of None means Natural length. Returns the output path, or None
+    when none of the files could be processed.
+    `incremental` appends new files to combined_live.mp4 instead (Natural
+    length only, the engine is ignored); with `arrival_order` in the order
+    they arrive, for orders in ARRIVAL_ORDERS. `profile` is one of ENCODE_PROFILES.
+    `renditions` names several RENDITIONS to render at once: the largest is
+    the output, the others are written as combined_<timestamp>_<name>.mp4
+    from the same decode of every source (listed in stats["renditions"]).
+    Without it the output is TARGET_W x TARGET_H.
+    Files with the same content as an earlier file are found first; with
+    DUPLICATES_KEEP the clip engine encodes each content once and repeats
+    it, with DUPLICATES_DROP only the first occurrence is used.
+    With a `spool` folder the clips are made by run_spool_worker() processes
+    (clip engine only) and this process only waits for them and joins them.
+    The video is written under a temporary name and renamed when complete.
+    Progress is recorded in a RenderJob (`job` when resuming one) that is
+    removed on success; see resume_job().
+    Timings and sizes of the run are written to METRICS_DIR, see save_run_metrics().
+    """
+    global _metrics, _job
+    output_folder = os.path.abspath(output_folder)
+    os.makedirs(output_folder, exist_ok=True)
+    ts = time.strftime("%Y%m%d_%H%M%S")
+    errors = [] if errors is None else errors
+    stats = {} if stats is None else stats
+
+    incremental = incremental and minutes is None
+    # Largest first; the live video keeps the default size
+    names = [] if incremental else sorted(
+        set(renditions or ()), key=lambda name: RENDITIONS[name][0] * RENDITIONS[name][1], reverse=True
+    )
+    size = RENDITIONS[names[0]] if names else None
+    settings = {
+        "image_duration": image_duration,
+        "minutes": minutes,
+        "workers": workers,
+        "engine": engine,
+        "incremental": incremental,
+        "profile": profile,
+        "renditions": names,
+        "duplicates": duplicates,
+        "spool": spool,
+    }
+    metrics = RunMetrics(dict(settings, files=len(files), cpu_count=cpu_cores(),
+                              resumed=job.id if job else None))
+    if job is None and not incremental:
+        # The live video keeps its own manifest
+        job = RenderJob(output_folder, ts, files, settings)
+    if job is not None:
+        job.save("running")
+
+    out_video = job.output if job else os.path.join(output_folder, INCREMENTAL_OUTPUT)
+    outputs = [out_video] + [os.path.join(output_folder, f"combined_{job.id}_{name}.mp4")
+                             for name in names[1:]]
+    # Hidden and not named combined_*.mp4 until they are complete
+    partials = [os.path.join(output_folder, f".{os.path.basename(out)}.partial.mp4")
+                for out in outputs]
+    partial = partials[0]
+    extra = [(RENDITIONS[name], path) for name, path in zip(names[1:], partials[1:])]
+    list_file = os.path.join(output_folder, f"list_{job.id if job else ts}.txt")
+
+    _metrics, previous = metrics, _metrics
+    _job, previous_job = job, _job
+    status = "failed"
+    try:
+        with metrics_stage("duplicates"):
+            repeats = find_duplicates(files, workers)
+        if duplicates == DUPLICATES_DROP and repeats:
+            files = [f for f in files if f not in repeats]
+            stats["dropped"], repeats = len(repeats), {}
+        if incremental:
+            out_video = render_incremental(files, output_folder, image_duration, progress_cb,
+                                           workers, errors, stats, profile, arrival_order)
+        else:
+            if engine == ENGINE_DIRECT and not spool:
+                segments = render_direct(files, partial, image_duration, progress_cb,
+                                         minutes, workers, errors, profile=profile,
+                                         work_dir=job.work_dir, size=size, renditions=extra)
+                stats["segments"] = segments
+                rendered = segments > 0
+            else:
+                rendered = render_clips(files, partial, list_file, image_duration, progress_cb,
+                                        minutes, workers, errors, stats, profile,
+                                        job.work_dir, size, extra, repeats,
+                                        spool=spool) is not None
+            if rendered:
+                for tmp, out in zip(partials, outputs):
+                    os.replace(tmp, out)
+                if names:
+                    stats["renditions"] = dict(zip(names, outputs))
+            else:
+                out_video = None
+        status = "ok" if out_video else "failed"
+        return out_video
+    except (RenderCancelled, KeyboardInterrupt):
+        status = "cancelled"
+        raise
+    finally:
+        _metrics, _job = previous, previous_job
+        for tmp in partials:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        if job is not None:
+            if status == "ok":
+                job.discard()
+            else:
+                # Keep the manifest and work folder for resume_job()
+                job.save(status)
+        result = metrics.to_dict(
+            status=status,
+            output=out_video if status == "ok" else None,
+            bytes=os.path.getsize(out_video) if status == "ok" else 0,
+            stats=stats,
+            skipped=[{"file": f, "error": reason} for f, reason in errors],
+        )
+        try:
+            save_run_metrics(result, ts)
+        except OSError:
+            pass  # Metrics must never fail a render
+        try:
+            record_history(result)
+        except (sqlite3.Error, OSError):
+            pass
+
+
+# ================= RENDER HISTORY =================
+# Every render is logged to a SQLite database in the app data folder: one row
+# per run and one per source file with its kind, resolution, codec, length and
+# how long its clip took. The throughput fitted from the newest runs of this
+# host predicts how long a render will take; see predict_render().
+HISTORY_DB = os.path.join(get_app_data_dir(), "history.sqlite3")
+HISTORY_VERSION = 1
+# Runs used to fit the throughput model, the newest first
+HISTORY_FIT_RUNS = 200
+# Source heights grouping files of similar cost
+HISTORY_HEIGHT_BUCKETS = (480, 720, 1080, 2160)
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    host TEXT NOT NULL,
+    started REAL NOT NULL,
+    seconds REAL NOT NULL,
+    status TEXT NOT NULL,
+    engine TEXT,
+    profile TEXT,
+    workers INTEGER,
+    cpu_count INTEGER,
+    files INTEGER,
+    output_seconds REAL,
+    clips_seconds REAL,
+    concat_seconds REAL
+);
+CREATE TABLE IF NOT EXISTS files (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    codec TEXT,
+    duration REAL,
+    bytes INTEGER,
+    method TEXT,
+    seconds REAL
+);
+CREATE INDEX IF NOT EXISTS files_run ON files(run_id);
+"""
+
+
+def open_history(path=None):
+    """Connection to the render history, created on first use"""
+    path = path or HISTORY_DB
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Batch renders write from several processes at once
+    db = sqlite3.connect(path, timeout=30)
+    if db.execute("PRAGMA user_version").fetchone()[0] != HISTORY_VERSION:
+        db.executescript(HISTORY_SCHEMA)
+        db.execute(f"PRAGMA user_version = {HISTORY_VERSION}")
+    return db
+
+
+def height_bucket(height):
+    """Smallest HISTORY_HEIGHT_BUCKETS entry at least `height`, 0 for the larger ones"""
+    return next((b for b in HISTORY_HEIGHT_BUCKETS if height <= b), 0)
+
+
+def file_record(path):
+    """Input characteristics of a source file for the history"""
+    try:
+        info = probe_media_cached(path)
+    except Exception:
+        info = {}
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    return {
+        "kind": "image" if path.lower().endswith(IMAGE_EXTS) else "video",
+        "width": info.get("width", 0),
+        "height": info.get("height", 0),
+        "codec": info.get("video_codec"),
+        "bytes": size,
+    }
+
+
+def record_history(result, path=None):
+    """Log a render from its metrics (RunMetrics.to_dict()) to the history"""
+    settings = result["settings"]
+    # Everything but the clips scales with the output: probing, joining, writing
+    clips_seconds = result["stages"].get("clips", 0.0)
+    engine = "incremental" if settings["incremental"] else settings["engine"]
+    output_seconds = get_video_duration(result["output"]) if result["output"] else 0.0
+    with closing(open_history(path)) as db, db:
+        run_id = db.execute(
+            "INSERT INTO runs (host, started, seconds, status, engine, profile, workers, "
+            "cpu_count, files, output_seconds, clips_seconds, concat_seconds) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (socket.gethostname(), time.time() - result["seconds"], result["seconds"],
+             result["status"], engine, settings["profile"], settings["workers"],
+             settings["cpu_count"], settings["files"], output_seconds,
+             clips_seconds, result["seconds"] - clips_seconds)
+        ).lastrowid
+        rows = []
+        for clip in result["clips"]:
+            # The images of a slideshow share its length and time
+            share = 1 / len(clip["sources"])
+            for source in clip["sources"]:
+                f = file_record(source)
+                rows.append((run_id, f["kind"], f["width"], f["height"], f["codec"],
+                             clip["duration"] * share, f["bytes"], clip["method"],
+                             clip.get("seconds", 0.0) * share))
+        db.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+
+class ThroughputModel:
+    """
+    Seconds of work per second of output, fitted from the render history of
+    this host for one profile: per clip method and source height for the
+    clip engine, per run for the single pass engine, plus the time spent
+    joining the clips per second of output.
+    """
+
+    def __init__(self, profile=PROFILE_BALANCED, path=None):
+        self.profile = profile
+        self.clip_rates = {}
+        self.concat_rate = None
+        self.direct_rate = None
+        try:
+            with closing(open_history(path)) as db:
+                self.fit(db)
+        except (sqlite3.Error, OSError):
+            pass  # No history, no predictions
+
+    def fit(self, db):
+        host = socket.gethostname()
+        newest = db.execute("SELECT COALESCE(MAX(id), 0) FROM runs").fetchone()[0]
+        recent = "FROM runs WHERE host = ? AND profile = ? AND status = 'ok' AND id > ?"
+        params = (host, self.profile, newest - HISTORY_FIT_RUNS)
+
+        totals = {}
+        for method, height, seconds, duration in db.execute(
+                "SELECT method, height, seconds, duration FROM files WHERE run_id IN "
+                f"(SELECT id {recent}) AND method IN (?, ?, ?) AND duration > 0",
+                params + (CLIP_IMAGE, CLIP_REMUXED, CLIP_TRANSCODED)):
+            for key in ((method, height_bucket(height)), (method, None)):
+                total = totals.setdefault(key, [0.0, 0.0])
+                total[0] += seconds
+                total[1] += duration
+        self.clip_rates = {key: s / d for key, (s, d) in totals.items() if d > 0}
+
+        for engine, column in ((ENGINE_CLIPS, "concat_seconds"), (ENGINE_DIRECT, "seconds")):
+            seconds, output = db.execute(
+                f"SELECT SUM({column}), SUM(output_seconds) {recent} AND engine = ? "
+                "AND output_seconds > 0", params + (engine,)
+            ).fetchone()
+            rate = seconds / output if seconds is not None and output else None
+            if engine == ENGINE_CLIPS:
+                self.concat_rate = rate
+            else:
+                self.direct_rate = rate
+
+    def clip_seconds(self, path, image_duration, info=None, remux=False):
+        """
+        Predicted work for the clip of one file, None when there is no
+        history for it. Videos need their probe `info`; images are not
+        probed and use the rate of all image sizes.
+        """
+        if path.lower().endswith(IMAGE_EXTS):
+            method, duration, bucket = CLIP_IMAGE, float(image_duration), None
+        else:
+            method = CLIP_REMUXED if remux else CLIP_TRANSCODED
+            duration, bucket = info["duration"], height_bucket(info["height"])
+        rate = self.clip_rates.get((method, bucket), self.clip_rates.get((method, None)))
+        return None if rate is None else rate * duration
+
+
+def predict_render(files, image_duration, minutes=None, workers=DEFAULT_WORKERS,
+                   engine=ENGINE_CLIPS, profile=PROFILE_BALANCED, model=None):
+    """
+    Predicted time of a render from the history: {"seconds", "clips"} where
+    clips is the part spent making clips, or None without enough history.
+    Clips already in the clip cache cost nothing. Videos are probed like
+    estimate_total_duration() does, so this may take a while on a new folder.
+    """
+    model = model or ThroughputModel(profile)
+    info = probe_files([f for f in files if not f.lower().endswith(IMAGE_EXTS)], workers)
+    natural = estimate_total_duration(files, image_duration, workers)
+    length = minutes * 60 if minutes is not None else natural
+    if engine == ENGINE_DIRECT:
+        if model.direct_rate is None:
+            return None
+        return {"seconds": model.direct_rate * length, "clips": 0.0}
+    if model.concat_rate is None:
+        return None
 
-# ================= SETTINGS ======================
-DEFAULT_IMAGE_DURATION = 1.5
-TARGET_W = 1280
-TARGET_H = 720
-TARGET_FPS = "30"
-AUTO_CHECK_INTERVAL_MS = 3000
-# ================================================
+    work = 0.0
+    remux = minutes is None and remux_sources(files, fps=profile_fps(profile), workers=workers)
+    cached = cached_sources(files, image_duration, profile, remux)
+    for f in dict.fromkeys(files):
+        if f in cached:
+            continue
+        if not f.lower().endswith(IMAGE_EXTS) and info.get(f) is None:
+            continue  # Unreadable, it will be skipped
+        seconds = model.clip_seconds(f, image_duration, info.get(f), remux)
+        if seconds is None:
+            return None
+        work += seconds
+    # Custom length only encodes the files it needs, loops reuse them
+    if natural > 0 and length < natural:
+        work *= length / natural
+    clips = work / max(1, min(int(workers), len(files)))
+    return {"seconds": clips + model.concat_rate * length, "clips": clips}
 
-VIDEO_EXTS = (".mp4", ".mov", ".avi", ".mkv", ".webm", ".m4v")
-IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
 
-ASPECT_SAFE_FILTER = (
-    f"scale={TARGET_W}:{TARGET_H}:force_original_aspect_ratio=decrease,"
-    f"pad={TARGET_W}:{TARGET_H}:(ow-iw)/2:(oh-ih)/2"
-)
+def safe_predict_render(*args, **kwargs):
+    """predict_render() for a render about to start: None instead of any error"""
+    try:
+        return predict_render(*args, **kwargs)
+    except Exception:
+        return None  # Only feeds the time left, never fails the render
 
-ORDER_NAME = "Sort by name"
-ORDER_DATE_NEW = "Sort by date (newest first)"
-ORDER_DATE_OLD = "Sort by date (oldest first)"
-ORDER_RANDOM = "Random"
 
+class RenderEta:
+    """Time left of a render, from predict_render() and its progress reports"""
 
-# ------------------------------------------------
+    def __init__(self, prediction):
+        self.prediction = prediction
+        self.started = time.monotonic()
+        self.fraction = 0.0
+        # Seconds into the render when `fraction` was reached
+        self.reached = 0.0
 
-def list_media_files(folder, order_mode):
-    if not os.path.isdir(folder):
-        return []
+    def update(self, current, total, text):
+        """Feed a progress report (as given to progress_cb)"""
+        step = current / total if total else 0.0
+        prediction = self.prediction
+        share = (prediction["clips"] / prediction["seconds"]
+                 if prediction and prediction["seconds"] > 0 else 1.0)
+        if text in ("Processing media", "Waiting for workers"):
+            fraction = share * step
+        elif text == "Combining":
+            fraction = share
+        else:
+            fraction = step
+        # Custom length builds clips in batches that restart the count
+        fraction = min(fraction, 1.0)
+        if fraction > self.fraction:
+            self.fraction = fraction
+            self.reached = time.monotonic() - self.started
 
-    files = [
-        os.path.join(folder, f)
-        for f in os.listdir(folder)
-        if f.lower().endswith(VIDEO_EXTS + IMAGE_EXTS)
-    ]
+    def remaining(self):
+        """Seconds left, or None when there is nothing to go on yet"""
+        elapsed = time.monotonic() - self.started
+        predicted = self.prediction["seconds"] if self.prediction else None
+        observed = self.reached / self.fraction if self.fraction > 0 else None
+        if predicted is None:
+            if self.fraction < 0.05:
+                return None
+            total = observed
+        elif observed is None:
+            total = predicted
+        else:
+            # The pace observed so far counts more as the render goes on
+            total = (1 - self.fraction) * predicted + self.fraction * observed
+        return max(0.0, total - elapsed)
 
-    if order_mode == ORDER_RANDOM:
-        random.shuffle(files)
-        return files
-    if order_mode == ORDER_DATE_NEW:
-        return sorted(files, key=os.path.getmtime, reverse=True)
-    if order_mode == ORDER_DATE_OLD:
-        return sorted(files, key=os.path.getmtime)
 
-    return sorted(files, key=lambda x: os.path.basename(x).lower())
+def format_duration(seconds):
+    """90 -> '1 min 30 s'"""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes} min {seconds} s" if minutes else f"{seconds} s"
 
 
-def get_video_duration(path):
+def capacity_report(since=None, path=None):
+    """
+    Per host and profile: runs, output minutes, busy hours (overlapping runs
+    counted once) and the folder minutes per hour the host sustained.
+    """
+    with closing(open_history(path)) as db:
+        rows = db.execute(
+            "SELECT host, profile, started, seconds, output_seconds FROM runs "
+            "WHERE status = 'ok' AND started >= ? ORDER BY started",
+            (since or 0,)
+        ).fetchall()
+
+    groups = {}
+    for host, profile, started, seconds, output in rows:
+        groups.setdefault((host, profile), []).append((started, started + seconds, output or 0))
+
+    report = []
+    for (host, profile), runs in sorted(groups.items()):
+        busy, end = 0.0, None
+        for start, stop, _ in runs:
+            if end is None or start > end:
+                busy += stop - start
+                end = stop
+            elif stop > end:
+                busy += stop - end
+                end = stop
+        output_minutes = sum(output for _, _, output in runs) / 60
+        report.append({
+            "host": host,
+            "profile": profile,
+            "runs": len(runs),
+            "output_minutes": round(output_minutes, 2),
+            "busy_hours": round(busy / 3600, 3),
+            "folder_minutes_per_hour": round(output_minutes / (busy / 3600), 1) if busy else None,
+        })
+    return report
+
+
+# ================= PREVIEW =================
+# The first seconds of a render made by the same pipeline at a proxy size,
+# frame rate and the fastest encoder settings (PROFILE_PREVIEW). How long it
+# took projects the time of the full render.
+PREVIEW_SECONDS = 30
+PREVIEW_SIZE = (384, 216)
+PREVIEW_OUTPUT = "preview.mp4"
+# Rough defaults: encoder time of a profile at full size relative to the preview
+# settings for the same second of media, measured once on a folder of 720p/1080p
+# videos and photos. Only this ratio is assumed, the preview measures the rest.
+PREVIEW_COST_RATIO = {
+    PROFILE_DRAFT: 2.7,
+    PROFILE_BALANCED: 5.0,
+    PROFILE_ARCHIVE: 7.0,
+    PROFILE_PREVIEW: 1.0,
+}
+
+
+def project_render_seconds(setup_seconds, clip_work, clip_length, join_seconds,
+                           preview_length, full_length, encoded_share=1.0, parallel=1,
+                           profile=PROFILE_BALANCED):
+    """
+    Time a render of `full_length` seconds at `profile` should take, from a
+    preview that rendered `preview_length` seconds: `setup_seconds` of work
+    that does not depend on the length (duplicate search, probing), FFmpeg
+    busy for `clip_work` seconds making `clip_length` seconds of clips, and
+    `join_seconds` for everything else. Only `encoded_share` of the full
+    length needs encoding (the rest is cached or remuxed), spread over
+    `parallel` FFmpeg jobs.
+    """
+    if preview_length <= 0:
+        return None
+    ratio = PREVIEW_COST_RATIO[profile]
+    clips = 0.0
+    if clip_length > 0:
+        clips = clip_work / clip_length * full_length * encoded_share * ratio / max(1, parallel)
+    return setup_seconds + clips + join_seconds / preview_length * full_length * ratio
+
+
+def encoded_share(files, image_duration, profile=PROFILE_BALANCED, remux=False,
+                  workers=DEFAULT_WORKERS):
+    """
+    Share of the natural length of `files` a clip engine render would encode:
+    files whose clip is not in the clip cache and that are not remuxed.
+    """
+    info = probe_files([f for f in files if not f.lower().endswith(IMAGE_EXTS)], workers)
+    cached = cached_sources(files, image_duration, profile, remux)
+    total = encoded = 0.0
+    for f in files:
+        is_image = f.lower().endswith(IMAGE_EXTS)
+        length = image_duration if is_image else (info[f]["duration"] if info.get(f) else 0.0)
+        total += length
+        if f not in cached and (is_image or not remux):
+            encoded += length
+    return encoded / total if total > 0 else 1.0
+
+
+def render_preview(files, output_folder, image_duration, progress_cb, seconds=PREVIEW_SECONDS,
+                   minutes=None, workers=DEFAULT_WORKERS, engine=ENGINE_CLIPS, errors=None,
+                   stats=None, profile=PROFILE_BALANCED, duplicates=DUPLICATES_KEEP):
+    """
+    Render the first `seconds` of what render_files() would make into
+    output_folder/preview.mp4 at PREVIEW_SIZE with PROFILE_PREVIEW. The clip
+    cache is not used, so the preview costs what fresh work costs. Returns
+    the preview path, or None when none of the files could be processed.
+    `stats` receives "preview_length" and "preview_seconds" (what was
+    rendered and how long it took), "full_length" and "projected_seconds",
+    the expected time of the full render at `profile`: the encoder work the
+    preview measured per second of clips, scaled to the full length, the
+    profile (PREVIEW_COST_RATIO) and the clips the full render can reuse.
+    """
+    global _metrics
+    os.makedirs(output_folder, exist_ok=True)
+    errors = [] if errors is None else errors
+    stats = {} if stats is None else stats
+    output = os.path.join(output_folder, PREVIEW_OUTPUT)
+    partial = os.path.join(output_folder, f".{PREVIEW_OUTPUT}.partial.mp4")
+    start = time.monotonic()
+
+    repeats = find_duplicates(files, workers)
+    if duplicates == DUPLICATES_DROP and repeats:
+        files = [f for f in files if f not in repeats]
+        stats["dropped"], repeats = len(repeats), {}
+    full_length = (minutes * 60 if minutes is not None
+                   else estimate_total_duration(files, image_duration, workers))
+    # Natural length is cut short without looping the media
+    preview_minutes = min(seconds, full_length) / 60
+    setup = time.monotonic() - start
+
+    # Collects the encoder time of every clip, see record_metric()
+    metrics = RunMetrics({"preview": True})
+    _metrics, previous = metrics, _metrics
     try:
-        r = subprocess.run(
-            [
-                FFPROBE_PATH, "-v", "error",
-                "-show_entries", "format=duration",
-                "-of", "default=noprint_wrappers=1:nokey=1",
-                path
-            ],
-            capture_output=True, text=True, check=True
-        )
-        return float(r.stdout.strip())
-    except:
-        return 0.0
+        if engine == ENGINE_DIRECT:
+            segments = render_direct(files, partial, image_duration, progress_cb,
+                                     preview_minutes, workers, errors, profile=PROFILE_PREVIEW,
+                                     size=PREVIEW_SIZE, loop=minutes is not None)
+            stats["segments"] = segments
+            rendered = segments > 0
+        else:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                rendered = render_clips(files, partial, os.path.join(temp_dir, "list.txt"),
+                                        image_duration, progress_cb, preview_minutes, workers,
+                                        errors, stats, PROFILE_PREVIEW, size=PREVIEW_SIZE,
+                                        duplicates=repeats, loop=minutes is not None,
+                                        use_cache=False) is not None
+        if not rendered:
+            return None
+        os.replace(partial, output)
+    finally:
+        _metrics = previous
+        if os.path.exists(partial):
+            os.remove(partial)
 
+    elapsed = time.monotonic() - start
+    preview_length = get_video_duration(output)
+    result = metrics.to_dict()
+    clips = [c for c in result["clips"] if c["method"] not in (CLIP_CACHED, CLIP_DUPLICATE)]
+    clip_work = sum(c.get("seconds", 0.0) for c in clips)
+    join = elapsed - setup - result["stages"].get("clips", 0.0)
+    if engine == ENGINE_DIRECT:
+        share, parallel = 1.0, 1  # Measured as a whole, chunks included
+    else:
+        remux = minutes is None and remux_sources(files, workers=workers)
+        share = encoded_share(files, image_duration, profile, remux, workers)
+        parallel = min(int(workers), len(files))
+    projected = project_render_seconds(setup, clip_work, sum(c["duration"] for c in clips),
+                                       join, preview_length, full_length, share, parallel,
+                                       profile)
+    stats.update({
+        "preview_length": round(preview_length, 3),
+        "preview_seconds": round(elapsed, 3),
+        "full_length": round(full_length, 3),
+        "projected_seconds": round(projected, 1) if projected is not None else None,
+    })
+    return output
 
-def estimate_total_duration(files, image_duration):
-    total = 0.0
+
+def format_preview(stats):
+    """One line summary of a render_preview() run and its projection"""
+    text = (f"Previewed {format_duration(stats['preview_length'])} "
+            f"in {format_duration(stats['preview_seconds'])}")
+    if stats.get("projected_seconds") is not None:
+        text += (f" · the full {format_duration(stats['full_length'])} video should take about "
+                 f"{format_duration(stats['projected_seconds'])}")
+    return text
+
+
+def trash_files(files):
+    """Move files to the Recycle Bin, returns (deleted_count, [(name, error)])"""
+    from send2trash import send2trash
+
+    deleted_count = 0
+    failed_files = []
     for f in files:
-        total += image_duration if f.lower().endswith(IMAGE_EXTS) else get_video_duration(f)
-    return total
+        try:
+            # Normalize path to handle any path issues
+            file_path = os.path.normpath(f)
+            if os.path.exists(file_path):
+                send2trash(file_path)
+                deleted_count += 1
+            else:
+                failed_files.append((os.path.basename(f), "File not found"))
+        except Exception as e:
+            failed_files.append((os.path.basename(f), str(e)))
+    return deleted_count, failed_files
 
 
-def normalize_video(input_video, out_dir):
-    out = os.path.join(
-        out_dir,
-        os.path.splitext(os.path.basename(input_video))[0] + "_norm.mp4"
-    )
+# ================= FOLDER WATCHER =================
 
-    subprocess.run([
-        FFMPEG_PATH, "-y",
-        "-err_detect", "ignore_err",
-        "-i", input_video,
-        "-vf", ASPECT_SAFE_FILTER,
-        "-r", TARGET_FPS,
-        "-c:v", "libx264",
-        "-pix_fmt", "yuv420p",
-        "-movflags", "+faststart",
-        out
-    ], check=True)
+class InotifyBackend:
+    """Linux change notifications for a folder tree (no extra dependencies)"""
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = os.O_NONBLOCK
+    IN_CLOEXEC = 0o2000000
 
-    return out
+    EVENT = struct.Struct("iIII")
 
+    def __init__(self, folder):
+        import ctypes
 
-def image_to_video(image_path, out_dir, image_duration):
-    out = os.path.join(
-        out_dir,
-        os.path.splitext(os.path.basename(image_path))[0] + "_img.mp4"
-    )
+        self.ctypes = ctypes
+        # The symbols of the running process include libc (glibc and musl)
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = folder
+        self.watches = {}
+        try:
+            self.add_watch(folder)
+        except OSError:
+            os.close(self.fd)
+            raise
 
-    subprocess.run([
-        FFMPEG_PATH, "-y",
-        "-loop", "1",
-        "-i", image_path,
-        "-t", str(image_duration),
-        "-vf", ASPECT_SAFE_FILTER,
-        "-r", TARGET_FPS,
-        "-c:v", "libx264",
-        "-pix_fmt", "yuv420p",
-        out
-    ], check=True)
+    def add_watch(self, folder):
+        mask = (self.IN_MODIFY | self.IN_ATTRIB | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM
+                | self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE
+                | self.IN_DELETE_SELF | self.IN_MOVE_SELF)
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), mask)
+        if wd < 0:
+            raise OSError(self.ctypes.get_errno(), f"Cannot watch {folder}")
+        self.watches[wd] = folder
 
-    return out, image_duration
+    def watched(self):
+        return set(self.watches.values())
 
+    def changes(self):
+        """
+        Paths of the media files and folders that changed since the last call,
+        or None when everything must be scanned again (events were lost or the
+        watched folder itself was moved or deleted).
+        """
+        changed, rescan = set(), False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return None if rescan else changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0").decode("utf-8", "replace")
+                offset += length
 
-def build_clips(files, temp_dir, image_duration, progress_cb):
-    clips = []
-    total = len(files)
+                folder = self.watches.get(wd)
+                if mask & self.IN_IGNORED:
+                    self.watches.pop(wd, None)
+                if mask & self.IN_Q_OVERFLOW or (
+                        folder == self.root and mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF)):
+                    rescan = True
+                elif folder is not None and name and (
+                        mask & self.IN_ISDIR or name.lower().endswith(VIDEO_EXTS + IMAGE_EXTS)):
+                    changed.add(os.path.join(folder, name))
 
-    for i, f in enumerate(files, start=1):
-        progress_cb(i, total, "Processing media")
+    def close(self):
+        os.close(self.fd)
 
-        if f.lower().endswith(IMAGE_EXTS):
-            clip, dur = image_to_video(f, temp_dir, image_duration)
-        else:
-            clip = normalize_video(f, temp_dir)
-            dur = get_video_duration(clip)
 
-        if dur > 0:
-            clips.append((clip, dur))
+class FolderWatcher:
+    """
+    Reports changes to the media files of a MediaIndex once they have settled.
+    Uses inotify on Linux, where only the changed paths are looked at again,
+    and falls back to rescanning the index on every check.
+    A change is only reported after no events arrived for `settle_seconds`
+    and two scans that far apart saw the same (path, size, mtime) snapshot,
+    so files that are still being copied in are not picked up.
+    """
+    def __init__(self, folder, settle_seconds=WATCH_SETTLE_SECONDS, index=None):
+        self.folder = folder
+        self.settle_seconds = settle_seconds
+        self.index = index or MediaIndex(folder)
+        self.backend = None
+        if sys.platform.startswith("linux"):
+            try:
+                self.backend = InotifyBackend(folder)
+            except (OSError, AttributeError):
+                self.backend = None  # e.g. watch limit reached or no inotify
 
-    return clips
+        self.snapshot = self.index.refresh()
+        self.sync_watches()
+        self.pending = None
+        self.pending_since = 0.0
+        self.last_event = 0.0
+        self.dirty = False
+        self.changed = set()
+        self.rescan = False
 
+    @property
+    def native(self):
+        return self.backend is not None
 
-def build_clips_fixed(files, temp_dir, minutes, image_duration, progress_cb):
-    target_seconds = minutes * 60
-    normalized = build_clips(files, temp_dir, image_duration, progress_cb)
+    def sync_watches(self):
+        """Watch the subfolders the index found (recursive indexes only)"""
+        if self.backend is None or not self.index.recursive:
+            return
+        try:
+            for folder in self.index.dirs - self.backend.watched():
+                self.backend.add_watch(folder)
+        except OSError:
+            # Out of inotify watches: poll the whole tree instead
+            self.backend.close()
+            self.backend = None
 
-    clips, total = [], 0
-    while total < target_seconds:
-        for clip, dur in normalized:
-            clips.append((clip, dur))
-            total += dur
-            if total >= target_seconds:
-                break
+    def refresh(self):
+        if self.backend is None or self.rescan:
+            snapshot = self.index.refresh()
+        else:
+            snapshot = self.index.refresh(self.changed)
+        self.sync_watches()
+        return snapshot
 
-    return clips
+    def settled(self):
+        self.pending, self.dirty = None, False
+        self.changed, self.rescan = set(), False
+
+    def check(self):
+        """Return the new snapshot when a settled change is detected, else None"""
+        now = time.monotonic()
+        if self.backend is None:
+            self.dirty, self.last_event = True, 0.0
+        else:
+            changes = self.backend.changes()
+            if changes is None:
+                self.dirty, self.rescan, self.last_event = True, True, now
+            elif changes:
+                self.dirty, self.last_event = True, now
+                self.changed |= changes
 
+        # Nothing happened since the last settled state
+        if not self.dirty:
+            return None
+        # Debounce bursts of events
+        if now - self.last_event < self.settle_seconds:
+            return None
 
-def write_concat_list(clips, list_file):
-    with open(list_file, "w", encoding="utf-8") as f:
-        for path, _ in clips:
-            f.write(f"file '{path.replace('\\', '/')}'\n")
-
-
-def final_concat(list_file, output):
-    subprocess.run([
-        FFMPEG_PATH, "-y",
-        "-f", "concat",
-        "-safe", "0",
-        "-i", list_file,
-        "-c:v", "libx264",
-        "-pix_fmt", "yuv420p",
-        "-r", TARGET_FPS,
-        "-movflags", "+faststart",
-        output
-    ], check=True)
+        current = self.refresh()
+        if current == self.snapshot:
+            self.settled()
+            return None
+        if current != self.pending:
+            # Changed (or still changing): look again once it had time to settle
+            self.pending, self.pending_since = current, now
+            return None
+        if now - self.pending_since < self.settle_seconds:
+            return None
+
+        self.snapshot = current
+        self.settled()
+        return current
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
 
 
 # ================= GUI ======================
 
+def load_gui():
+    """Import the GUI toolkit, only needed when the window is shown"""
+    global tk, ttk, messagebox, filedialog, webbrowser
+    import tkinter as tk
+    from tkinter import messagebox, ttk, filedialog
+    import webbrowser
+
+
 class App:
     def __init__(self, root):
         root.title(f"AutoFolder VideoMixer v{__version__}")
@@ -250,7 +3501,7 @@ class App:
             pass  # Icon is optional, continue without it
         
         # Check if FFmpeg is available
-        if not FFMPEG_PATH or not FFPROBE_PATH:
+        if not all(get_ffmpeg()):
             messagebox.showerror(
                 "FFmpeg Not Found",
                 "FFmpeg and FFprobe are required but not found.\n\n"
@@ -322,6 +3573,17 @@ class App:
         self.image_duration_entry.insert(0, str(DEFAULT_IMAGE_DURATION))
         self.image_duration_entry.grid(row=3, column=1, sticky="w", pady=6)
 
+        # ----- Parallel jobs -----
+        ttk.Label(frame, text="Parallel jobs:").grid(row=4, column=0, sticky="w", pady=(0, 6))
+        self.workers_var = tk.StringVar(value=str(DEFAULT_WORKERS))
+        ttk.Spinbox(
+            frame,
+            textvariable=self.workers_var,
+            from_=1,
+            to=max(1, os.cpu_count() or 1),
+            width=26
+        ).grid(row=4, column=1, sticky="w", pady=(0, 6))
+
         # ----- Order -----
         ttk.Label(frame, text="Order:").grid(row=5, column=0, sticky="w")
         ttk.Combobox(
@@ -332,40 +3594,101 @@ class App:
             width=26
         ).grid(row=5, column=1, sticky="w")
 
+        # ----- Render engine -----
+        ttk.Label(frame, text="Render engine:").grid(row=6, column=0, sticky="w", pady=(6, 0))
+        self.engine_var = tk.StringVar(value=ENGINE_CLIPS)
+        ttk.Combobox(
+            frame,
+            textvariable=self.engine_var,
+            values=[ENGINE_CLIPS, ENGINE_DIRECT],
+            state="readonly",
+            width=26
+        ).grid(row=6, column=1, sticky="w", pady=(6, 0))
+
+        # ----- Encode profile -----
+        ttk.Label(frame, text="Quality:").grid(row=7, column=0, sticky="w", pady=(6, 0))
+        self.profile_var = tk.StringVar(value=PROFILE_BALANCED)
+        quality_frame = ttk.Frame(frame)
+        quality_frame.grid(row=7, column=1, columnspan=2, sticky="w", pady=(6, 0))
+        ttk.Combobox(
+            quality_frame,
+            textvariable=self.profile_var,
+            values=[p for p in ENCODE_PROFILES if p != PROFILE_PREVIEW],
+            state="readonly",
+            width=26
+        ).grid(row=0, column=0, padx=(0, 8))
+        # Every ticked size is rendered from the same pass
+        self.rendition_vars = {}
+        for i, (name, size) in enumerate(RENDITIONS.items(), 1):
+            self.rendition_vars[name] = tk.BooleanVar(value=size == (TARGET_W, TARGET_H))
+            ttk.Checkbutton(quality_frame, text=name, variable=self.rendition_vars[name])\
+                .grid(row=0, column=i)
+
+        # ----- File filters -----
+        ttk.Label(frame, text="Include / exclude:").grid(row=8, column=0, sticky="w", pady=(6, 0))
+        filter_frame = ttk.Frame(frame)
+        filter_frame.grid(row=8, column=1, columnspan=2, sticky="w", pady=(6, 0))
+        self.include_entry = ttk.Entry(filter_frame, width=20)
+        self.include_entry.grid(row=0, column=0, padx=(0, 8))
+        self.exclude_entry = ttk.Entry(filter_frame, width=20)
+        self.exclude_entry.grid(row=0, column=1)
+
+        options_frame = ttk.Frame(frame)
+        options_frame.grid(row=9, column=0, columnspan=3, sticky="w", pady=(10, 0))
+        self.recursive_var = tk.BooleanVar()
+        ttk.Checkbutton(options_frame, text="Include subfolders", variable=self.recursive_var)\
+            .grid(row=0, column=0, padx=(0, 12))
+        self.drop_duplicates_var = tk.BooleanVar()
+        ttk.Checkbutton(options_frame, text="Skip duplicate files", variable=self.drop_duplicates_var)\
+            .grid(row=0, column=1)
+
         # ----- Auto + delete -----
         ttk.Checkbutton(frame, text="Auto combine when files change", variable=self.auto_var)\
-            .grid(row=6, column=0, columnspan=3, sticky="w", pady=(10, 4))
+            .grid(row=10, column=0, columnspan=3, sticky="w", pady=(10, 4))
 
         ttk.Checkbutton(
             frame,
             text="Delete source files after combine (Recycle Bin)",
             variable=self.delete_var
-        ).grid(row=7, column=0, columnspan=3, sticky="w", pady=4)
+        ).grid(row=11, column=0, columnspan=3, sticky="w", pady=4)
+
+        self.incremental_var = tk.BooleanVar()
+        ttk.Checkbutton(
+            frame,
+            text=f"Append new files to {INCREMENTAL_OUTPUT} (Natural length)",
+            variable=self.incremental_var
+        ).grid(row=12, column=0, columnspan=3, sticky="w", pady=4)
 
         # ----- Progress -----
         self.progress_label = ttk.Label(frame, text="")
-        self.progress_label.grid(row=8, column=0, columnspan=3, sticky="w", pady=(10, 2))
+        self.progress_label.grid(row=13, column=0, columnspan=3, sticky="w", pady=(10, 2))
         
         # ----- Auto-monitoring status indicator -----
         self.auto_status_label = ttk.Label(frame, text="", font=('Segoe UI', 8), foreground="#666666")
-        self.auto_status_label.grid(row=9, column=0, columnspan=3, sticky="w", pady=(2, 6))
+        self.auto_status_label.grid(row=14, column=0, columnspan=3, sticky="w", pady=(2, 6))
 
         # ----- Buttons -----
         btns = ttk.Frame(frame)
-        btns.grid(row=10, column=0, columnspan=3, sticky="e", pady=(10, 0))
+        btns.grid(row=15, column=0, columnspan=3, sticky="e", pady=(10, 0))
 
-        ttk.Button(btns, text="Generate", command=self.run).grid(row=0, column=0, padx=6)
-        ttk.Button(btns, text="Exit", command=root.destroy).grid(row=0, column=1)
+        self.preview_btn = ttk.Button(btns, text="Preview",
+                                      command=lambda: self.run(preview=True))
+        self.preview_btn.grid(row=0, column=0)
+        self.generate_btn = ttk.Button(btns, text="Generate", command=self.run)
+        self.generate_btn.grid(row=0, column=1, padx=6)
+        self.cancel_btn = ttk.Button(btns, text="Cancel", command=self.cancel, state="disabled")
+        self.cancel_btn.grid(row=0, column=2, padx=(0, 6))
+        ttk.Button(btns, text="Exit", command=self.exit).grid(row=0, column=3)
 
         # ----- Creator Info -----
         creator_frame = ttk.Frame(frame)
-        creator_frame.grid(row=11, column=0, columnspan=3, pady=(15, 0))
+        creator_frame.grid(row=16, column=0, columnspan=3, pady=(15, 0))
         
-        ttk.Separator(frame, orient='horizontal').grid(row=12, column=0, columnspan=3, sticky='ew', pady=(10, 8))
+        ttk.Separator(frame, orient='horizontal').grid(row=17, column=0, columnspan=3, sticky='ew', pady=(10, 8))
         
         # Creator info in one line with clickable name
         creator_container = ttk.Frame(frame)
-        creator_container.grid(row=13, column=0, columnspan=3)
+        creator_container.grid(row=18, column=0, columnspan=3)
         
         ttk.Label(creator_container, text="Created by: ", font=('Segoe UI', 8)).pack(side='left')
         
@@ -380,8 +3703,19 @@ class App:
         name_label.bind("<Button-1>", lambda e: webbrowser.open("mailto:dilshaprathibha@gmail.com"))
 
         root.bind("<Return>", lambda e: self.run())
+        root.protocol("WM_DELETE_WINDOW", self.exit)
 
-        self.last_snapshot = set()
+        # Renders run on a worker thread and report back through this queue
+        self.root = root
+        self.events = queue.Queue()
+        self.render_thread = None
+        # RenderEta of the render in progress, read by show_progress()
+        self.eta = None
+        self.follow_up = False
+        self.progress_text = ""
+
+        self.index = None
+        self.watcher = None
         self.schedule_auto_check(root)
 
     def confirm_delete(self, *_):
@@ -493,8 +3827,16 @@ class App:
 
     def set_progress(self, current, total, text):
         percent = int((current / total) * 100) if total else 0
-        self.progress_label.config(text=f"{text}: {current}/{total} ({percent}%)")
-        self.progress_label.update_idletasks()
+        self.progress_text = f"{text}: {current}/{total} ({percent}%)"
+        self.show_progress()
+
+    def show_progress(self):
+        """Progress line plus the live FFmpeg throughput and time left while a render runs"""
+        live = format_throughput(live_throughput())
+        left = self.eta.remaining() if self.eta is not None else None
+        if left is not None:
+            live = (live + " · " if live else "") + f"about {format_duration(left)} left"
+        self.progress_label.config(text=self.progress_text + ("\n" + live if live else ""))
 
     def on_length_mode_change(self, *_):
         """Called when video length mode dropdown changes"""
@@ -543,45 +3885,112 @@ class App:
             self.calculate_estimate()
 
     def calculate_estimate(self):
-        """Calculate and display estimated video length"""
+        """
+        Calculate the estimated video length and render time on a worker
+        thread, probing a large folder must not freeze the window
+        """
         try:
             image_duration = float(self.image_duration_entry.get())
         except:
             return
+        try:
+            workers = int(self.workers_var.get())
+        except:
+            workers = DEFAULT_WORKERS
 
-        files = list_media_files(self.input_var.get(), self.order_var.get())
-        total_sec = estimate_total_duration(files, image_duration)
-        minutes = total_sec / 60
+        index = self.media_index()
+        index.refresh()
+        files = index.files(self.order_var.get())
+        engine, profile = self.engine_var.get(), self.profile_var.get()
+        result = queue.Queue()
 
-        self.minutes_entry.config(state="normal")
-        self.minutes_entry.delete(0, tk.END)
-        self.minutes_entry.insert(0, f"Estimated: {minutes:.2f}")
-        self.minutes_entry.config(state="readonly")
+        def estimate():
+            total_sec = estimate_total_duration(files, image_duration, workers)
+            prediction = safe_predict_render(files, image_duration, None, workers, engine,
+                                             profile)
+            result.put((total_sec, prediction))
+
+        threading.Thread(target=estimate, daemon=True).start()
+        self.root.after(100, lambda: self.show_estimate(result))
+
+    def show_estimate(self, result):
+        """Display the result of calculate_estimate() once it is ready"""
+        try:
+            total_sec, prediction = result.get_nowait()
+        except queue.Empty:
+            self.root.after(100, lambda: self.show_estimate(result))
+            return
+
+        if self.natural_var.get():
+            minutes = total_sec / 60
+            self.minutes_entry.config(state="normal")
+            self.minutes_entry.delete(0, tk.END)
+            self.minutes_entry.insert(0, f"Estimated: {minutes:.2f}")
+            self.minutes_entry.config(state="readonly")
+        if prediction and self.render_thread is None:
+            self.progress_label.config(
+                text=f"Rendering should take about {format_duration(prediction['seconds'])}")
+
+    def media_index(self):
+        """MediaIndex for the current folder and filters, shared with the watcher"""
+        index = MediaIndex(
+            self.input_var.get(),
+            self.recursive_var.get(),
+            split_patterns(self.include_entry.get()),
+            split_patterns(self.exclude_entry.get()),
+        )
+        if self.index is None or self.index.settings != index.settings:
+            self.index = index
+        return self.index
 
     def schedule_auto_check(self, root):
-        root.after(AUTO_CHECK_INTERVAL_MS, lambda: self.auto_check(root))
+        # Change notifications make a check cheap, polling needs a full scan
+        interval = WATCH_TICK_MS if self.watcher and self.watcher.native else AUTO_CHECK_INTERVAL_MS
+        root.after(interval, lambda: self.auto_check(root))
 
     def auto_check(self, root):
         if self.auto_var.get() and self.has_generated_once:
             self.auto_status_label.config(text="🟢 Auto-monitoring active - watching for file changes...")
-            current_files = set(list_media_files(self.input_var.get(), self.order_var.get()))
-            if current_files and current_files != self.last_snapshot:
-                self.last_snapshot = current_files
+            index = self.media_index()
+            if self.watcher is None or self.watcher.index is not index:
+                # Start from the current state, it has just been combined
+                if self.watcher:
+                    self.watcher.close()
+                self.watcher = FolderWatcher(index.folder, index=index)
+            current_files = self.watcher.check()
+            if current_files:
+                self.auto_status_label.config(text="🔄 Auto-monitoring: Processing changes...")
+                self.run(auto=True)
+            elif self.render_thread is not None and self.follow_up:
+                self.auto_status_label.config(text="🔄 Auto-monitoring: More changes queued...")
+            elif self.render_thread is not None:
                 self.auto_status_label.config(text="🔄 Auto-monitoring: Processing changes...")
-                self.run()
-                self.auto_status_label.config(text="🟢 Auto-monitoring active - watching for file changes...")
         else:
             self.auto_status_label.config(text="")
+            if self.watcher:
+                self.watcher.close()
+                self.watcher = None
         self.schedule_auto_check(root)
 
-    def run(self):
+    def run(self, auto=False, preview=False):
+        if self.render_thread is not None and preview:
+            return
         # Mark that Generate button has been clicked at least once
-        self.has_generated_once = True
+        self.has_generated_once = self.has_generated_once or not preview
+
+        if self.render_thread is not None:
+            # Changes seen during a render are merged into one follow-up render
+            if auto:
+                self.follow_up = True
+            return
         
-        input_folder = self.input_var.get()
         output_folder = self.output_var.get()
 
-        files = list_media_files(input_folder, self.order_var.get())
+        index = self.media_index()
+        if not (auto and self.watcher and self.watcher.index is index):
+            index.refresh()
+        # After a settled change the watcher has just refreshed the shared index
+        files = index.files(self.order_var.get())
         if not files:
             return
 
@@ -593,9 +4002,8 @@ class App:
             messagebox.showerror("Error", "Invalid image duration.")
             return
 
-        natural = self.natural_var.get()
-
-        if not natural:
+        minutes = None
+        if not self.natural_var.get():
             try:
                 minutes = float(self.minutes_entry.get())
                 if minutes <= 0:
@@ -604,54 +4012,746 @@ class App:
                 messagebox.showerror("Error", "Invalid minutes.")
                 return
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            clips = (
-                build_clips(files, temp_dir, image_duration, self.set_progress)
-                if natural
-                else build_clips_fixed(files, temp_dir, minutes, image_duration, self.set_progress)
+        try:
+            workers = int(self.workers_var.get())
+            if workers <= 0:
+                raise ValueError
+        except:
+            messagebox.showerror("Error", "Invalid number of parallel jobs.")
+            return
+
+        renditions = [name for name, var in self.rendition_vars.items() if var.get()]
+        if not renditions:
+            messagebox.showerror("Error", "Select at least one output size.")
+            return
+
+        job = None
+        jobs = [] if auto or preview else find_resumable_jobs(output_folder)
+        if jobs:
+            answer = messagebox.askyesnocancel(
+                "Resume render",
+                f"The render combined_{jobs[0].id}.mp4 did not finish ({len(jobs[0].files)} files, {len(jobs[0].done)} clips done).\n\n"
+                "Yes: resume it with its original files and settings\n"
+                "No: discard it and start a new render"
             )
+            if answer is None:
+                return
+            if answer:
+                job = jobs.pop(0)
+                files = job.files
+            for old in jobs:
+                old.discard()
+
+        reset_cancel()
+        self.generate_btn.config(state="disabled")
+        self.preview_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
+        self.progress_text = "Starting..."
+        self.progress_label.config(text=self.progress_text)
 
-            os.makedirs(output_folder, exist_ok=True)
-            ts = time.strftime("%Y%m%d_%H%M%S")
-            list_file = os.path.join(output_folder, f"list_{ts}.txt")
-            out_video = os.path.join(output_folder, f"combined_{ts}.mp4")
+        self.render_thread = threading.Thread(
+            target=self.render_worker,
+            args=(files, output_folder, image_duration, minutes, workers,
+                  self.engine_var.get(), self.delete_var.get(), self.incremental_var.get(),
+                  self.profile_var.get(), renditions,
+                  DUPLICATES_DROP if self.drop_duplicates_var.get() else DUPLICATES_KEEP, job,
+                  preview, self.order_var.get()),
+            daemon=True
+        )
+        self.render_thread.start()
+        self.root.after(100, self.poll_render)
 
-            self.set_progress(len(files), len(files), "Combining")
-            write_concat_list(clips, list_file)
-            final_concat(list_file, out_video)
+    def render_worker(self, files, output_folder, image_duration, minutes, workers, engine,
+                      delete, incremental, profile, renditions, duplicates, job=None,
+                      preview=False, order=ORDER_NAME):
+        """Runs on the worker thread, must not touch any widget"""
+        eta = self.eta = RenderEta(None)
 
-            if self.delete_var.get():
-                try:
-                    deleted_count = 0
-                    failed_files = []
-                    for f in files:
-                        try:
-                            # Normalize path to handle any path issues
-                            file_path = os.path.normpath(f)
-                            if os.path.exists(file_path):
-                                send2trash(file_path)
-                                deleted_count += 1
-                            else:
-                                failed_files.append((os.path.basename(f), "File not found"))
-                        except Exception as e:
-                            failed_files.append((os.path.basename(f), str(e)))
-                    
-                    # Show result
-                    if failed_files:
-                        error_msg = f"Deleted {deleted_count} files.\n\nFailed to delete {len(failed_files)} files:\n"
-                        for fname, error in failed_files[:5]:  # Show first 5 errors
-                            error_msg += f"\n{fname}: {error}"
-                        if len(failed_files) > 5:
-                            error_msg += f"\n... and {len(failed_files) - 5} more"
-                        messagebox.showwarning("Partial Deletion", error_msg)
-                except Exception as e:
-                    messagebox.showerror("Delete Error", f"Error deleting files: {str(e)}")
-
-            self.progress_label.config(text="Done ✔")
-            messagebox.showinfo("Success", f"Video created:\n{out_video}")
+        def progress(current, total, text):
+            eta.update(current, total, text)
+            self.events.put(("progress", current, total, text))
 
+        errors, stats = [], {}
+        try:
+            if job is None and not preview and not incremental:
+                eta.prediction = safe_predict_render(files, image_duration, minutes, workers,
+                                                     engine, profile)
+            if job is not None:
+                # Resumed with the settings it was started with
+                out_video = resume_job(job, progress, errors, stats)
+            elif preview:
+                out_video = render_preview(files, output_folder, image_duration, progress,
+                                           PREVIEW_SECONDS, minutes, workers, engine, errors,
+                                           stats, profile, duplicates)
+            else:
+                out_video = render_files(files, output_folder, image_duration, progress,
+                                         minutes, workers, engine, errors, stats, incremental,
+                                         profile, renditions, duplicates,
+                                         arrival_order=order in ARRIVAL_ORDERS)
+            deleted = None
+            if out_video and delete and not preview:
+                # Never delete sources that did not make it into the video
+                skipped = {f for f, _ in errors}
+                deleted = trash_files([f for f in files if f not in skipped])
+            self.events.put(("done", out_video, errors, stats, deleted))
+        except RenderCancelled:
+            self.events.put(("cancelled",))
+        except Exception as e:
+            self.events.put(("failed", describe_error(e)))
 
-if __name__ == "__main__":
+    def poll_render(self):
+        """Apply events from the render worker on the Tk thread"""
+        finished = None
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == "progress":
+                self.set_progress(*event[1:])
+            else:
+                finished = event
+
+        if finished is None:
+            self.show_progress()
+            self.root.after(100, self.poll_render)
+            return
+
+        self.render_thread = None
+        self.eta = None
+        self.generate_btn.config(state="normal")
+        self.preview_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        if self.auto_var.get() and self.has_generated_once:
+            self.auto_status_label.config(text="🟢 Auto-monitoring active - watching for file changes...")
+
+        kind = finished[0]
+        if kind == "cancelled":
+            self.progress_label.config(text="Cancelled")
+            self.follow_up = False
+        elif kind == "failed":
+            self.progress_label.config(text="")
+            messagebox.showerror("Error", f"Video generation failed:\n{finished[1]}")
+        else:
+            self.show_result(*finished[1:])
+
+        if self.follow_up:
+            self.follow_up = False
+            self.run(auto=True)
+
+    def show_result(self, out_video, errors, stats, deleted):
+        if not out_video:
+            self.progress_label.config(text="")
+            messagebox.showerror("Error", "None of the media files could be processed.")
+            return
+
+        if deleted:
+            deleted_count, failed_files = deleted
+            if failed_files:
+                error_msg = f"Deleted {deleted_count} files.\n\nFailed to delete {len(failed_files)} files:\n"
+                for fname, error in failed_files[:5]:  # Show first 5 errors
+                    error_msg += f"\n{fname}: {error}"
+                if len(failed_files) > 5:
+                    error_msg += f"\n... and {len(failed_files) - 5} more"
+                messagebox.showwarning("Partial Deletion", error_msg)
+
+        self.progress_label.config(text="Done ✔")
+        summary = format_clip_stats(stats)
+        if "preview_length" in stats:
+            summary = format_preview(stats)
+        # Every size when several were rendered
+        out_video = "\n".join(stats.get("renditions", {}).values()) or out_video
+        if errors:
+            msg = f"Video created:\n{out_video}\n{summary}\n\nSkipped {len(errors)} files that could not be processed:\n"
+            for f, reason in errors[:5]:  # Show first 5 errors
+                msg += f"\n{os.path.basename(f)}: {reason}"
+            if len(errors) > 5:
+                msg += f"\n... and {len(errors) - 5} more"
+            messagebox.showwarning("Partial Success", msg)
+        else:
+            messagebox.showinfo("Success", f"Video created:\n{out_video}\n{summary}")
+
+    def cancel(self):
+        if self.render_thread is not None:
+            self.progress_label.config(text="Cancelling...")
+            self.cancel_btn.config(state="disabled")
+            cancel_renders()
+
+    def exit(self):
+        # Do not leave FFmpeg processes running in the background
+        cancel_renders()
+        if self.watcher:
+            self.watcher.close()
+        self.root.destroy()
+
+
+# ================= COMMAND LINE =================
+# Exit codes of the command line interface
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+EXIT_NO_FFMPEG = 4
+EXIT_CANCELLED = 130
+
+CLI_ORDERS = {
+    "name": ORDER_NAME,
+    "newest": ORDER_DATE_NEW,
+    "oldest": ORDER_DATE_OLD,
+    "random": ORDER_RANDOM,
+}
+CLI_ENGINES = {
+    "clips": ENGINE_CLIPS,
+    "direct": ENGINE_DIRECT,
+}
+CLI_PROFILES = {
+    "draft": PROFILE_DRAFT,
+    "balanced": PROFILE_BALANCED,
+    "archive": PROFILE_ARCHIVE,
+}
+CLI_DUPLICATES = {
+    "keep": DUPLICATES_KEEP,
+    "drop": DUPLICATES_DROP,
+}
+
+
+def print_json(data):
+    print(json.dumps(data), flush=True)
+
+
+def cli_progress(quiet, eta=None):
+    """
+    Progress callback printing to stderr, so stdout stays machine readable.
+    With a RenderEta the time left is shown too.
+    """
+    def progress(current, total, text):
+        if eta is not None:
+            eta.update(current, total, text)
+        if not quiet:
+            percent = int((current / total) * 100) if total else 0
+            live = format_throughput(live_throughput())
+            left = eta.remaining() if eta is not None else None
+            print(f"{text}: {current}/{total} ({percent}%)" + (f" [{live}]" if live else "")
+                  + (f" ~{format_duration(left)} left" if left is not None else ""),
+                  file=sys.stderr, flush=True)
+    return progress
+
+
+def cli_render(args, files, job=None):
+    """
+    Render `files` with the command line options, or resume `job` with its own
+    settings. Returns (exit code, result).
+    """
+    # Only the render command has --preview, which never touches the sources
+    preview = getattr(args, "preview", None) if job is None else None
+    errors, stats = [], {}
+    start = time.time()
+    try:
+        if job is not None:
+            out_video = resume_job(job, cli_progress(args.quiet), errors, stats)
+        elif preview:
+            out_video = render_preview(
+                files, args.output, args.image_duration, cli_progress(args.quiet), preview,
+                args.minutes, args.jobs, CLI_ENGINES[args.engine], errors, stats,
+                CLI_PROFILES[args.profile], CLI_DUPLICATES[args.duplicates]
+            )
+        else:
+            eta = None
+            if not args.quiet and not args.incremental:
+                eta = RenderEta(safe_predict_render(
+                    files, args.image_duration, args.minutes, args.jobs,
+                    CLI_ENGINES[args.engine], CLI_PROFILES[args.profile]
+                ))
+            out_video = render_files(
+                files, args.output, args.image_duration, cli_progress(args.quiet, eta),
+                args.minutes, args.jobs, CLI_ENGINES[args.engine], errors, stats,
+                args.incremental, CLI_PROFILES[args.profile], args.rendition,
+                CLI_DUPLICATES[args.duplicates], args.spool,
+                arrival_order=CLI_ORDERS[args.order] in ARRIVAL_ORDERS
+            )
+    except RenderCancelled:
+        return EXIT_CANCELLED, {"status": "cancelled"}
+    except Exception as e:
+        return EXIT_FAILED, {"status": "failed", "error": describe_error(e)}
+
+    result = {
+        "status": "ok",
+        "output": out_video,
+        "files": len(files),
+        "stats": stats,
+        "skipped": [{"file": f, "error": reason} for f, reason in errors],
+        "seconds": round(time.time() - start, 3),
+    }
+    if not out_video:
+        result["status"] = "failed"
+        result["error"] = "None of the media files could be processed"
+        return EXIT_FAILED, result
+
+    if args.delete and not preview:
+        skipped = {f for f, _ in errors}
+        deleted, failed = trash_files([f for f in files if f not in skipped])
+        result["deleted"] = deleted
+        result["delete_failed"] = [{"file": f, "error": e} for f, e in failed]
+
+    if errors:
+        result["status"] = "partial"
+        return EXIT_PARTIAL, result
+    return EXIT_OK, result
+
+
+def cmd_render(args):
+    files = list_media_files(args.input, CLI_ORDERS[args.order],
+                             args.recursive, args.include, args.exclude)
+    if not files:
+        print_json({"status": "failed", "error": f"No media files in {args.input}"})
+        return EXIT_FAILED
+    code, result = cli_render(args, files)
+    print_json(result)
+    return code
+
+
+def cmd_watch(args):
+    """Daemon: render every settled change of the input folder, one JSON line each"""
+    index = MediaIndex(args.input, args.recursive, args.include, args.exclude)
+    watcher = FolderWatcher(args.input, index=index)
+    print_json({"status": "watching", "input": args.input,
+                "backend": "inotify" if watcher.native else "polling"})
+    interval = (WATCH_TICK_MS if watcher.native else AUTO_CHECK_INTERVAL_MS) / 1000
+
+    pending = args.initial
+    try:
+        while True:
+            if watcher.check():
+                pending = True
+            if pending:
+                pending = False
+                # The watcher keeps the index up to date, no need to scan again
+                files = watcher.index.files(CLI_ORDERS[args.order])
+                if files:
+                    code, result = cli_render(args, files)
+                    print_json(result)
+                    if code == EXIT_CANCELLED:
+                        return code
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        cancel_renders()
+        return EXIT_OK
+    finally:
+        watcher.close()
+
+
+def cmd_resume(args):
+    """Finish an interrupted render of the output folder, the newest by default"""
+    jobs = find_resumable_jobs(args.output)
+    if args.list:
+        for job in jobs:
+            print_json({"job": job.id, "status": job.status, "files": len(job.files),
+                        "done": len(job.done), "settings": job.settings})
+        return EXIT_OK
+    if args.job:
+        jobs = [job for job in jobs if job.id == args.job]
+    if not jobs:
+        print_json({"status": "failed", "error": f"No interrupted render in {args.output}"})
+        return EXIT_FAILED
+    code, result = cli_render(args, jobs[0].files, jobs[0])
+    result["job"] = jobs[0].id
+    print_json(result)
+    return code
+
+
+# ------------------------------------------------
+# A batch manifest is a JSON list of folder jobs, or {"max_concurrent": N, "jobs": [...]}.
+# Every job is rendered by a `render` process of its own, so a job that fails or
+# crashes is reported and the queue goes on.
+BATCH_DEFAULT_CONCURRENT = 2
+BATCH_JOB_KEYS = {
+    "name", "input", "output", "priority", "order", "minutes", "image_duration", "jobs",
+    "engine", "profile", "renditions", "recursive", "include", "exclude", "incremental",
+    "delete", "duplicates", "spool",
+}
+
+
+def load_batch_manifest(path):
+    """
+    (max_concurrent or None, jobs) of a batch manifest. Folders are relative
+    to the manifest; options not given in a job take the `render` defaults.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        data = {"jobs": data}
+
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for n, job in enumerate(data.get("jobs", []), 1):
+        if not isinstance(job, dict) or not job.get("input") or not job.get("output"):
+            raise ValueError(f"Job {n}: 'input' and 'output' folders are required")
+        unknown = set(job) - BATCH_JOB_KEYS
+        if unknown:
+            raise ValueError(f"Job {n}: unknown settings {', '.join(sorted(unknown))}")
+        job = dict(job)
+        for key in ("input", "output", "spool"):
+            if job.get(key):
+                job[key] = os.path.join(base, os.path.expanduser(job[key]))
+        job.setdefault("name", f"{n}:{os.path.basename(os.path.normpath(job['input']))}")
+        jobs.append(job)
+    return data.get("max_concurrent"), jobs
+
+
+def batch_render_argv(job, workers, cores=None):
+    """`render` command line arguments of a batch job"""
+    argv = [
+        "render", job["input"], job["output"], "-q",
+        "--order", job.get("order", "name"),
+        "--image-duration", str(job.get("image_duration", DEFAULT_IMAGE_DURATION)),
+        "-j", str(job.get("jobs", workers)),
+        "--engine", job.get("engine", "clips"),
+        "--profile", job.get("profile", "balanced"),
+        "--duplicates", job.get("duplicates", "keep"),
+    ]
+    if job.get("minutes") is not None:
+        argv += ["--minutes", str(job["minutes"])]
+    if job.get("spool"):
+        argv += ["--spool", job["spool"]]
+    if cores:
+        argv += ["--cores", str(cores)]
+    for key in ("include", "exclude", "renditions"):
+        values = job.get(key, [])
+        for value in split_patterns(values) if isinstance(values, str) else values:
+            argv += ["--rendition" if key == "renditions" else f"--{key}", value]
+    for flag in ("recursive", "incremental", "delete"):
+        if job.get(flag):
+            argv.append(f"--{flag}")
+    return argv
+
+
+def self_command():
+    """Command line starting this program again, packaged or from source"""
+    if getattr(sys, "frozen", False):
+        return [sys.executable]
+    return [sys.executable, os.path.abspath(__file__)]
+
+
+def run_batch_job(job, workers, cores=None):
+    """Render one batch job in a separate process, returns (exit code, result)"""
+    proc = subprocess.run(
+        self_command() + batch_render_argv(job, workers, cores),
+        stdin=subprocess.DEVNULL, capture_output=True, text=True
+    )
+    try:
+        return proc.returncode, json.loads(proc.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        if proc.returncode == EXIT_CANCELLED:
+            return proc.returncode, {"status": "cancelled"}
+        # Crashed or rejected its options before printing a result
+        lines = [l for l in proc.stderr.splitlines() if l.strip()]
+        error = lines[-1].strip() if lines else f"Exited with code {proc.returncode}"
+        return proc.returncode or EXIT_FAILED, {"status": "failed", "error": error}
+
+
+def run_batch(jobs, max_concurrent, on_result):
+    """
+    Render `jobs` from a shared priority queue (highest "priority" first, then
+    manifest order) with at most `max_concurrent` renders at a time.
+    on_result(job, code, result) is called once per finished job, one at a
+    time. After cancel_renders() no new job is started. Returns the
+    (code, result) of each job in manifest order, None for jobs not started.
+    """
+    pending = queue.PriorityQueue()
+    for i, job in enumerate(jobs):
+        pending.put((-job.get("priority", 0), i, job))
+    max_concurrent = max(1, min(int(max_concurrent), len(jobs)))
+    # FFmpeg jobs of each render, unless the job sets its own, and the cores they share
+    workers = max(1, DEFAULT_WORKERS // max_concurrent)
+    cores = max(1, cpu_cores() // max_concurrent)
+    results = [None] * len(jobs)
+    lock = threading.Lock()
+
+    def runner():
+        while not _cancel_event.is_set():
+            try:
+                _, i, job = pending.get_nowait()
+            except queue.Empty:
+                return
+            results[i] = run_batch_job(job, workers, cores)
+            with lock:
+                on_result(job, *results[i])
+
+    threads = [threading.Thread(target=runner, daemon=True) for _ in range(max_concurrent)]
+    for t in threads:
+        t.start()
+    # Polled rather than joined: an interrupted join() can return early later on
+    try:
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        # The renders got the interrupt as well, wait until they stopped
+        cancel_renders()
+        while any(t.is_alive() for t in threads):
+            time.sleep(0.2)
+    return results
+
+
+def cmd_batch(args):
+    """Render every folder job of a manifest, one JSON line per job and a summary"""
+    try:
+        max_concurrent, jobs = load_batch_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print_json({"status": "failed", "error": describe_error(e)})
+        return EXIT_USAGE
+    max_concurrent = args.max_concurrent or max_concurrent or BATCH_DEFAULT_CONCURRENT
+    if not jobs:
+        print_json({"status": "failed", "error": f"No jobs in {args.manifest}"})
+        return EXIT_FAILED
+
+    def report(job, code, result):
+        print_json({"job": job["name"], "priority": job.get("priority", 0), "exit": code, **result})
+
+    results = run_batch(jobs, max_concurrent, report)
+    failed = [job["name"] for job, r in zip(jobs, results)
+              if r and r[0] not in (EXIT_OK, EXIT_PARTIAL, EXIT_CANCELLED)]
+    # Interrupted renders can be finished with `resume OUTPUT`
+    not_run = [job["name"] for job, r in zip(jobs, results) if r is None or r[0] == EXIT_CANCELLED]
+
+    summary = {"status": "ok", "jobs": len(jobs), "failed": failed, "not_run": not_run}
+    if not_run:
+        summary["status"] = "cancelled"
+        code = EXIT_CANCELLED
+    elif failed:
+        summary["status"] = "failed" if len(failed) == len(jobs) else "partial"
+        code = EXIT_FAILED if len(failed) == len(jobs) else EXIT_PARTIAL
+    else:
+        code = EXIT_OK
+    print_json(summary)
+    return code
+
+
+def cmd_worker(args):
+    """Do spool tasks until interrupted, one JSON line per finished clip"""
+    print_json({"status": "working", "spool": os.path.abspath(args.spool),
+                "host": socket.gethostname(),
+                "pid": os.getpid()})
+
+    def on_result(key, result):
+        print_json(dict(result, task=key))
+
+    try:
+        done = run_spool_worker(args.spool, args.jobs, args.idle_exit, on_result)
+    except KeyboardInterrupt:
+        return EXIT_CANCELLED
+    print_json({"status": "idle", "tasks": done})
+    return EXIT_OK
+
+
+def cmd_estimate(args):
+    files = list_media_files(args.input, CLI_ORDERS[args.order],
+                             args.recursive, args.include, args.exclude)
+    seconds = estimate_total_duration(files, args.image_duration, args.jobs)
+    prediction = predict_render(files, args.image_duration, args.minutes, args.jobs,
+                                CLI_ENGINES[args.engine], CLI_PROFILES[args.profile])
+    print_json({"status": "ok", "files": len(files), "seconds": round(seconds, 3),
+                "minutes": round(seconds / 60, 2),
+                "render_seconds": round(prediction["seconds"], 1) if prediction else None})
+    return EXIT_OK
+
+
+def cmd_history(args):
+    since = time.time() - args.days * 86400 if args.days else None
+    try:
+        report = capacity_report(since)
+    except (sqlite3.Error, OSError) as e:
+        print_json({"status": "failed", "error": str(e)})
+        return EXIT_FAILED
+    for row in report:
+        print_json(row)
+    return EXIT_OK
+
+
+def cmd_probe(args):
+    results = probe_files(args.files, args.jobs)
+    code = EXIT_OK
+    for path in args.files:
+        info = results.get(path)
+        if info is None:
+            code = EXIT_PARTIAL
+            print_json({"file": path, "status": "failed"})
+        else:
+            info = {k: v for k, v in info.items() if k != "streams"}
+            print_json({"file": path, "status": "ok", **info})
+    return code
+
+
+def positive_float(value):
+    number = float(value)
+    if number <= 0:
+        raise ValueError(value)
+    return number
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise ValueError(value)
+    return number
+
+
+def build_arg_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="AutoFolder",
+        description="Combine the videos and images of a folder into one MP4. "
+                    "Run without arguments to open the window."
+    )
+    parser.add_argument("--version", action="version", version=__version__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_media_options(p):
+        p.add_argument("input", help="folder with videos and images")
+        p.add_argument("--order", choices=CLI_ORDERS, default="name",
+                       help="media order (default: name)")
+        p.add_argument("-r", "--recursive", action="store_true", help="include subfolders")
+        p.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                       help="only use files matching this glob, e.g. '*.mov' or 'day1/*' (repeatable)")
+        p.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                       help="skip files and folders matching this glob (repeatable)")
+        p.add_argument("--image-duration", type=positive_float, default=DEFAULT_IMAGE_DURATION,
+                       metavar="SECONDS", help=f"seconds per image (default: {DEFAULT_IMAGE_DURATION})")
+        p.add_argument("-j", "--jobs", type=positive_int, default=DEFAULT_WORKERS,
+                       help=f"parallel FFmpeg jobs (default: {DEFAULT_WORKERS})")
+
+    def add_cores_option(p):
+        p.add_argument("--cores", type=positive_int, metavar="N",
+                       help="CPU cores the FFmpeg jobs share, e.g. when other renders run "
+                            "on the same machine (default: all)")
+
+    def add_render_options(p):
+        add_media_options(p)
+        p.add_argument("output", help="folder for combined_<timestamp>.mp4")
+        p.add_argument("--minutes", type=positive_float,
+                       help="fixed video length (Custom mode); default is Natural length")
+        p.add_argument("--engine", choices=CLI_ENGINES, default="clips",
+                       help="clips: cached per-file clips, direct: single pass (default: clips)")
+        p.add_argument("--profile", choices=CLI_PROFILES, default="balanced",
+                       help="encode speed/quality: draft (fastest), balanced, "
+                            "archive (best quality) (default: balanced)")
+        p.add_argument("--rendition", action="append", choices=RENDITIONS, metavar="SIZE",
+                       help=f"output size, repeat to render several at once: "
+                            f"{', '.join(RENDITIONS)} (default: {TARGET_H}p)")
+        p.add_argument("--duplicates", choices=CLI_DUPLICATES, default="keep",
+                       help="files with the same content: keep every occurrence but encode "
+                            "it once, or drop the repeats (default: keep)")
+        p.add_argument("--spool", metavar="DIR",
+                       help="shared folder where `worker` processes, on this or other hosts, "
+                            "make the clips; this process waits for them and joins them")
+        p.add_argument("--incremental", action="store_true",
+                       help=f"append new files to {INCREMENTAL_OUTPUT} instead of "
+                            "rendering everything again (Natural length only)")
+        p.add_argument("--delete", action="store_true",
+                       help="move the source files to the Recycle Bin afterwards")
+        add_cores_option(p)
+        p.add_argument("-q", "--quiet", action="store_true", help="no progress on stderr")
+
+    p = sub.add_parser("render", help="combine a folder once")
+    add_render_options(p)
+    p.add_argument("--preview", type=positive_float, nargs="?", const=PREVIEW_SECONDS,
+                   metavar="SECONDS",
+                   help=f"only render the first SECONDS (default: {PREVIEW_SECONDS}) as a small, "
+                        f"low frame rate {PREVIEW_OUTPUT} and print the projected time of the "
+                        "full render")
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser("watch", help="render again whenever the folder changes")
+    add_render_options(p)
+    p.add_argument("--initial", action="store_true", help="also render once at start")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("resume", help="finish an interrupted render")
+    p.add_argument("output", help="output folder of the interrupted render")
+    p.add_argument("--job", metavar="ID", help="job to resume (default: the newest)")
+    p.add_argument("--list", action="store_true", help="only print the interrupted renders")
+    p.add_argument("--delete", action="store_true",
+                   help="move the source files to the Recycle Bin afterwards")
+    p.add_argument("-q", "--quiet", action="store_true", help="no progress on stderr")
+    p.set_defaults(func=cmd_resume)
+
+    p = sub.add_parser("batch", help="render the folder jobs of a JSON manifest")
+    p.add_argument("manifest", help="JSON list of jobs with input, output and render options")
+    p.add_argument("-c", "--max-concurrent", type=positive_int, metavar="N",
+                   help="renders at the same time (default: the manifest's max_concurrent, "
+                        f"else {BATCH_DEFAULT_CONCURRENT})")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("worker", help="make the clips queued in a shared spool folder")
+    p.add_argument("spool", help="spool folder given to `render --spool`")
+    p.add_argument("-j", "--jobs", type=positive_int, default=DEFAULT_WORKERS,
+                   help=f"clips made at the same time (default: {DEFAULT_WORKERS})")
+    p.add_argument("--idle-exit", type=positive_float, metavar="SECONDS",
+                   help="stop after finding no task for this long (default: run until interrupted)")
+    add_cores_option(p)
+    p.set_defaults(func=cmd_worker)
+
+    p = sub.add_parser("estimate",
+                       help="print the Natural length of a folder and how long it should take "
+                            "to render")
+    add_media_options(p)
+    p.add_argument("--minutes", type=positive_float,
+                   help="fixed video length (Custom mode); default is Natural length")
+    p.add_argument("--engine", choices=CLI_ENGINES, default="clips",
+                   help="clips: cached per-file clips, direct: single pass (default: clips)")
+    p.add_argument("--profile", choices=CLI_PROFILES, default="balanced",
+                   help="encode speed/quality: draft, balanced, archive (default: balanced)")
+    p.set_defaults(func=cmd_estimate)
+
+    p = sub.add_parser("history",
+                       help="print the folder minutes per hour each host and profile "
+                            "rendered, as JSON lines")
+    p.add_argument("--days", type=positive_float, help="only the renders of the last DAYS")
+    # Reads the history database only, works without FFmpeg
+    p.set_defaults(func=cmd_history, needs_ffmpeg=False)
+
+    p = sub.add_parser("probe", help="print media information as JSON lines")
+    p.add_argument("files", nargs="+")
+    p.add_argument("-j", "--jobs", type=positive_int, default=DEFAULT_WORKERS)
+    p.set_defaults(func=cmd_probe)
+
+    return parser
+
+
+def run_gui():
+    load_gui()
     root = tk.Tk()
     App(root)
     root.mainloop()
+
+
+def interrupted(signum, frame):
+    """Ctrl-C: kill FFmpeg at once, before KeyboardInterrupt waits for worker threads"""
+    cancel_renders()
+    raise KeyboardInterrupt
+
+
+def main(argv=None):
+    """Entry point: the window without arguments, the command line otherwise"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        run_gui()
+        return EXIT_OK
+
+    global _cpu_budget
+    args = build_arg_parser().parse_args(argv)
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, interrupted)
+    _cpu_budget = getattr(args, "cores", None)
+    if getattr(args, "needs_ffmpeg", True) and not all(get_ffmpeg()):
+        print_json({"status": "failed", "error": "FFmpeg and FFprobe not found"})
+        return EXIT_NO_FFMPEG
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        cancel_renders()
+        return EXIT_CANCELLED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+# Caches go to a throwaway folder, read when AutoFolder is imported
+os.environ["LOCALAPPDATA"] = tempfile.mkdtemp(prefix="autofolder-tests-")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import AutoFolder as af  # noqa: E402
+
+
+@pytest.fixture
+def make_media():
+    """Writes small FFmpeg test videos and images"""
+    if not shutil.which(af.get_ffmpeg()[0]):
+        pytest.skip("FFmpeg not found")
+
+    def make(path, seconds=1, variant=0):
+        if path.lower().endswith(af.IMAGE_EXTS):
+            args = ["-f", "lavfi", "-i", "testsrc2=size=320x240:rate=1",
+                    "-vf", f"hue=h={variant * 45}", "-frames:v", "1"]
+        else:
+            args = ["-f", "lavfi", "-i", f"testsrc2=size=320x240:rate=25:duration={seconds}",
+                    "-f", "lavfi", "-i", f"sine=frequency={220 + 55 * variant}:duration={seconds}",
+                    "-vf", f"hue=h={variant * 45}", "-c:v", "libx264", "-preset", "ultrafast",
+                    "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest"]
+        subprocess.run([af.get_ffmpeg()[0], "-v", "error", "-y", *args, path], check=True)
+        return path
+    return make
@@ -0,0 +1,127 @@
+import os
+
+from conftest import af
+
+
+def test_clips_keep_the_order_of_the_files(tmp_path, make_media):
+    files = [make_media(str(tmp_path / "a.mp4"), variant=0),
+             make_media(str(tmp_path / "b.jpg"), variant=1),
+             make_media(str(tmp_path / "c.jpg"), variant=2),
+             make_media(str(tmp_path / "d.mp4"), seconds=2, variant=3)]
+    broken = tmp_path / "e.mp4"
+    broken.write_bytes(b"not a video")
+    errors, stats, sources = [], {}, []
+
+    clips = af.build_clips(files + [str(broken)], str(tmp_path), 1, lambda *_: None,
+                           workers=3, errors=errors, stats=stats, clip_sources=sources)
+
+    # The two images become one slideshow clip
+    assert sources == [[files[0]], files[1:3], [files[3]]]
+    assert [round(dur) for _, dur in clips] == [1, 2, 2]
+    assert [path for path, _ in errors] == [str(broken)]
+    assert stats[af.CLIP_IMAGE] == 2
+
+
+def test_clip_cache_key(tmp_path):
+    image, video = tmp_path / "a.jpg", tmp_path / "b.mp4"
+    image.write_bytes(b"image")
+    video.write_bytes(b"video")
+    key = af.clip_cache_key(str(image), 3)
+
+    assert af.clip_cache_key(str(image), 3) == key
+    assert af.clip_cache_key(str(image), 4) != key
+    assert af.clip_cache_key(str(image), 3, size=(640, 360)) != key
+    assert af.clip_cache_key(str(image), 3, profile=af.PROFILE_DRAFT) != key
+    # Remuxing only changes the clip of a video
+    assert af.clip_cache_key(str(image), 3, remux=True) == key
+    assert af.clip_cache_key(str(video), 3, remux=True) != af.clip_cache_key(str(video), 3)
+    # Neither does the image duration
+    assert af.clip_cache_key(str(video), 4) == af.clip_cache_key(str(video), 3)
+
+    image.write_bytes(b"edited")
+    assert af.clip_cache_key(str(image), 3) != key
+
+
+def test_clip_cache_store_and_lookup(tmp_path):
+    cache = str(tmp_path / "cache")
+    assert af.clip_cache_lookup(cache, "ab12") is None
+
+    def encode(folder, name):
+        (tmp_path / "cache" / "ab" / name).write_bytes(b"clip")
+        return 2.5
+
+    clip, duration = af.clip_cache_store(cache, "ab12", "source.mp4", encode)
+    assert af.clip_cache_lookup(cache, "ab12") == (clip, 2.5)
+    # No temporary files left behind
+    assert sorted(os.listdir(os.path.dirname(clip))) == ["ab12.json", "ab12.mp4"]
+
+    # Metadata without its clip is no entry
+    os.remove(clip)
+    assert af.clip_cache_lookup(cache, "ab12") is None
+
+
+def test_cached_clips_are_reused(tmp_path, make_media):
+    files = [make_media(str(tmp_path / "a.mp4"), variant=0),
+             make_media(str(tmp_path / "b.jpg"), variant=1)]
+    cache = str(tmp_path / "cache")
+
+    def build(temp):
+        stats = {}
+        os.makedirs(temp)
+        clips = af.build_clips(files, temp, 1, lambda *_: None, cache_dir=cache, stats=stats)
+        return clips, stats
+
+    first, stats = build(str(tmp_path / "run1"))
+    assert not stats.get(af.CLIP_CACHED)
+    second, stats = build(str(tmp_path / "run2"))
+    assert stats[af.CLIP_CACHED] == 2
+    assert second == first
+
+
+def test_remux_only_when_every_file_conforms(tmp_path, make_media):
+    a = make_media(str(tmp_path / "a.mp4"), variant=0)
+    b = make_media(str(tmp_path / "b.mp4"), variant=1)
+    image = make_media(str(tmp_path / "c.jpg"))
+
+    assert af.remux_sources([a, b], size=(320, 240), fps="25")
+    assert not af.remux_sources([a, b], size=(320, 240), fps="30")
+    assert not af.remux_sources([a, b])
+    assert not af.remux_sources([a, image], size=(320, 240), fps="25")
+    assert not af.remux_sources([], size=(320, 240), fps="25")
+
+
+def test_normalized_clips_are_uniform(tmp_path, make_media):
+    files = [make_media(str(tmp_path / "a.mp4"), variant=0),
+             make_media(str(tmp_path / "b.jpg"), variant=1)]
+    clips = af.build_clips(files, str(tmp_path), 1, lambda *_: None)
+
+    assert af.clips_are_uniform(clips)
+    # A source that was not normalized cannot join them by stream copy
+    assert not af.clips_are_uniform(clips + [(files[0], 1.0)])
+    assert not af.clips_are_uniform([])
+
+
+def test_fixed_length_loops_and_trims(tmp_path, make_media):
+    files = [make_media(str(tmp_path / "a.mp4"), seconds=2, variant=0),
+             make_media(str(tmp_path / "b.jpg"), variant=1)]
+    half_frame = 0.5 / float(af.profile_fps(af.PROFILE_BALANCED))
+
+    clips = af.build_clips_fixed(files, str(tmp_path), 5.5 / 60, 1, lambda *_: None)
+    assert abs(sum(dur for _, dur in clips) - 5.5) <= half_frame
+    assert len(clips) == 4 and os.path.basename(clips[-1][0]).startswith("trim_")
+    assert abs(af.get_video_duration(clips[-1][0]) - 0.5) < 0.1
+
+    clips = af.build_clips_fixed(files, str(tmp_path), 5.5 / 60, 1, lambda *_: None,
+                                 loop=False)
+    assert abs(sum(dur for _, dur in clips) - 3.0) < 0.1
+
+
+def test_fixed_length_builds_only_what_it_needs(tmp_path, make_media):
+    files = [make_media(str(tmp_path / "a.mp4"), seconds=2, variant=0),
+             make_media(str(tmp_path / "b.mp4"), seconds=2, variant=1)]
+    stats = {}
+
+    clips = af.build_clips_fixed(files, str(tmp_path), 1.5 / 60, 1, lambda *_: None,
+                                 stats=stats)
+    assert sum(stats.values()) == 1
+    assert len(clips) == 1 and abs(clips[0][1] - 1.5) < 0.1
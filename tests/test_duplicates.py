@@ -0,0 +1,45 @@
+import os
+
+from conftest import af
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_duplicates_map_to_the_first_copy(tmp_path):
+    block = af.PARTIAL_HASH_BYTES
+    same = b"a" * block + b"middle" + b"z" * block
+    files = [
+        write(tmp_path / "a.mp4", same),
+        write(tmp_path / "b.mp4", same),
+        # Same size, head and tail: only the full hash tells them apart
+        write(tmp_path / "c.mp4", b"a" * block + b"MIDDLE" + b"z" * block),
+        # Same content, but an image is not a copy of a video
+        write(tmp_path / "d.jpg", same),
+        write(tmp_path / "e.mp4", same),
+        write(tmp_path / "f.jpg", same),
+    ]
+
+    assert af.find_duplicates(files) == {files[1]: files[0], files[4]: files[0],
+                                         files[5]: files[3]}
+    # The first copy in the order of the files is kept
+    assert af.find_duplicates(files[::-1]) == {files[1]: files[4], files[0]: files[4],
+                                               files[3]: files[5]}
+
+
+def test_missing_files_are_ignored(tmp_path):
+    a = write(tmp_path / "a.mp4", b"x")
+    b = write(tmp_path / "b.mp4", b"x")
+    assert af.find_duplicates([a, str(tmp_path / "gone.mp4"), b, a]) == {b: a}
+
+
+def test_content_hash_follows_changes(tmp_path):
+    path = write(tmp_path / "a.mp4", b"first")
+    first = af.content_hash(path, "full")
+    assert af.content_hash(path, "full") == first
+
+    write(tmp_path / "a.mp4", b"again")
+    os.utime(path, ns=(0, 0))
+    assert af.content_hash(path, "full") != first
@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import af
+
+
+@pytest.fixture
+def layouts(monkeypatch):
+    """Clips named "v*" have video only, the others video and audio"""
+    def probe(path):
+        kinds = ["video"] if path.startswith("v") else ["video", "audio"]
+        return {"streams": [{"codec_type": kind} for kind in kinds]}
+    monkeypatch.setattr(af, "probe_media_cached", probe)
+
+
+def clip_list(names, seconds=30.0):
+    return [(name, seconds) for name in names]
+
+
+def test_short_videos_are_one_chunk(layouts):
+    clips = clip_list("abc")
+    assert af.plan_final_chunks(clips, 4) == [clips]
+    assert af.plan_final_chunks(clips * 2, 1) == [clips * 2]
+
+
+def test_chunks_are_contiguous_and_even(layouts):
+    clips = clip_list("abcdefghij")
+    runs = af.plan_final_chunks(clips, 3)
+    assert [len(run) for run in runs] == [4, 3, 3]
+    assert [clip for run in runs for clip in run] == clips
+
+
+def test_chunks_are_at_least_a_minute(layouts):
+    clips = clip_list("abcdefghij")
+    runs = af.plan_final_chunks(clips, 20)
+    assert len(runs) == 5
+    assert all(sum(dur for _, dur in run) >= af.FINAL_CHUNK_MIN_SECONDS for run in runs)
+
+
+def test_chunks_start_with_the_streams_of_the_first_clip(layouts):
+    clips = clip_list(["a", "b", "c", "d", "v", "f", "g", "h", "i", "j"])
+    runs = af.plan_final_chunks(clips, 3)
+    assert [run[0][0] for run in runs] == ["a", "f", "h"]
+
+
+@pytest.mark.parametrize("cores, jobs, threads", [
+    (8, 1, 8), (8, 4, 2), (8, 3, 3), (2, 8, 1), (8, 0, 8),
+])
+def test_schedule_threads(monkeypatch, cores, jobs, threads):
+    monkeypatch.setattr(af, "_cpu_budget", cores)
+    assert af.cpu_cores() == cores
+    assert af.schedule_threads(jobs) == threads
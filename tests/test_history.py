@@ -0,0 +1,90 @@
+import pytest
+
+from conftest import af
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(af.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_eta_needs_progress_without_prediction(clock):
+    eta = af.RenderEta(None)
+    assert eta.remaining() is None
+    clock[0] += 10
+    eta.update(1, 4, "Processing media")
+    assert eta.remaining() == pytest.approx(30.0)
+
+
+def test_eta_counts_down_the_prediction(clock):
+    eta = af.RenderEta({"seconds": 100.0, "clips": 80.0})
+    clock[0] += 30
+    assert eta.remaining() == pytest.approx(70.0)
+    clock[0] += 200
+    assert eta.remaining() == 0.0
+
+
+def test_eta_moves_to_the_observed_pace(clock):
+    eta = af.RenderEta({"seconds": 100.0, "clips": 80.0})
+    # Half the clips in 80 s: twice as slow as predicted
+    clock[0] += 80
+    eta.update(5, 10, "Processing media")
+    assert eta.fraction == pytest.approx(0.4)
+    # 0.6 * 100 predicted + 0.4 * 200 observed
+    assert eta.remaining() == pytest.approx(140.0 - 80.0)
+    # Counts never go back, e.g. the batches of Custom length
+    eta.update(1, 10, "Processing media")
+    assert eta.fraction == pytest.approx(0.4)
+    clock[0] += 20
+    eta.update(10, 10, "Combining")
+    assert eta.fraction == pytest.approx(0.8)
+
+
+def test_prediction_errors_do_not_fail_the_render(monkeypatch):
+    def broken(*args, **kwargs):
+        raise af.sqlite3.DatabaseError("file is not a database")
+    monkeypatch.setattr(af, "predict_render", broken)
+    assert af.safe_predict_render([], 1) is None
+
+
+def test_corrupt_history_has_no_model(tmp_path):
+    db = tmp_path / "history.sqlite3"
+    db.write_bytes(b"not a database" * 100)
+    model = af.ThroughputModel(path=str(db))
+    assert model.concat_rate is None and model.clip_rates == {}
+
+
+def run(host, profile, started, seconds, output):
+    return (host, started, seconds, "ok", af.ENGINE_CLIPS, profile, 1, 1, 1, output, 0.0, seconds)
+
+
+def test_capacity_counts_overlapping_runs_once(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    with af.closing(af.open_history(path)) as db, db:
+        db.executemany(
+            "INSERT INTO runs (host, started, seconds, status, engine, profile, workers, "
+            "cpu_count, files, output_seconds, clips_seconds, concat_seconds) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [run("a", af.PROFILE_BALANCED, 0, 1800, 600),
+             run("a", af.PROFILE_BALANCED, 900, 1800, 600),  # Overlaps the first
+             run("a", af.PROFILE_BALANCED, 7200, 900, 300),
+             run("b", af.PROFILE_DRAFT, 0, 3600, 1200)]
+        )
+    report = {(r["host"], r["profile"]): r for r in af.capacity_report(path=path)}
+    a = report[("a", af.PROFILE_BALANCED)]
+    # 0-2700 s and 7200-8100 s
+    assert a["runs"] == 3 and a["busy_hours"] == 1.0
+    assert a["folder_minutes_per_hour"] == 25.0
+    assert report[("b", af.PROFILE_DRAFT)]["folder_minutes_per_hour"] == 20.0
+    assert [r["runs"] for r in af.capacity_report(since=3600, path=path)] == [1]
+
+
+def test_history_runs_without_ffmpeg(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(af, "get_ffmpeg", lambda: (None, None))
+    monkeypatch.setattr(af, "HISTORY_DB", str(tmp_path / "history.sqlite3"))
+    monkeypatch.setattr(af.signal, "signal", lambda *_: None)
+    assert af.main(["history"]) == af.EXIT_OK
+    assert af.main(["probe", str(tmp_path / "a.mp4")]) == af.EXIT_NO_FFMPEG
+    assert "FFmpeg and FFprobe not found" in capsys.readouterr().out
@@ -0,0 +1,78 @@
+import json
+import os
+
+from conftest import af
+
+
+def live_segments(output):
+    with open(os.path.join(output, af.INCREMENTAL_DIR, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)["segments"]
+
+
+def render(folder, output):
+    stats = {}
+    files = af.list_media_files(folder, af.ORDER_NAME)
+    out = af.render_incremental(files, output, 1, lambda *_: None, stats=stats)
+    assert out == os.path.join(output, af.INCREMENTAL_OUTPUT)
+    return stats
+
+
+def test_appends_only_new_files(tmp_path, make_media):
+    folder, output = tmp_path / "in", str(tmp_path / "out")
+    folder.mkdir()
+    make_media(str(folder / "a.mp4"), variant=0)
+    make_media(str(folder / "b.jpg"), variant=1)
+
+    assert render(str(folder), output)["appended"] == 2
+    before = live_segments(output)
+
+    make_media(str(folder / "c.mp4"), variant=2)
+    assert render(str(folder), output)["appended"] == 1
+    after = live_segments(output)
+    assert after[:len(before)] == before
+    assert len(after) == len(before) + 1
+
+    assert "appended" not in render(str(folder), output)
+    assert live_segments(output) == after
+
+
+def state_of(*paths):
+    return {"sources": [[p, os.path.getsize(p), os.stat(p).st_mtime_ns] for p in paths]}
+
+
+def test_new_file_sorting_first(tmp_path):
+    a, b, c = (str(tmp_path / name) for name in ("a.jpg", "b.jpg", "c.jpg"))
+    for path in (a, b, c):
+        open(path, "wb").close()
+    state = state_of(b, c)
+
+    assert af.appended_files(state, [b, c, a]) == [a]
+    # Name order: the video must be rebuilt to put it first
+    assert af.appended_files(state, [a, b, c]) is None
+    # Newest first or random: appended as it arrives
+    assert af.appended_files(state, [a, c, b], arrival_order=True) == [a]
+    assert af.appended_files(state, [c, b], arrival_order=True) == []
+
+    with open(b, "wb") as f:
+        f.write(b"changed")
+    assert af.appended_files(state, [a, c, b], arrival_order=True) is None
+
+
+def test_newest_first_appends_new_files(tmp_path, make_media):
+    folder, output = tmp_path / "in", str(tmp_path / "out")
+    folder.mkdir()
+    make_media(str(folder / "a.mp4"), variant=0)
+    os.utime(folder / "a.mp4", (1_600_000_000, 1_600_000_000))
+    make_media(str(folder / "b.jpg"), variant=1)
+
+    def render_newest():
+        stats = {}
+        files = af.list_media_files(str(folder), af.ORDER_DATE_NEW)
+        af.render_incremental(files, output, 1, lambda *_: None, stats=stats,
+                              arrival_order=af.ORDER_DATE_NEW in af.ARRIVAL_ORDERS)
+        return stats
+
+    assert render_newest()["appended"] == 2
+    make_media(str(folder / "c.mp4"), variant=2)
+    assert render_newest()["appended"] == 1
+    assert len(live_segments(output)) == 3
@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+from conftest import af
+
+
+@pytest.fixture
+def folder(tmp_path, make_media):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    make_media(str(folder / "a.mp4"), seconds=2, variant=0)
+    make_media(str(folder / "b.jpg"), variant=1)
+    make_media(str(folder / "c.mp4"), seconds=2, variant=2)
+    return af.list_media_files(str(folder), af.ORDER_NAME)
+
+
+def test_concat_list_has_absolute_paths(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    af.write_concat_list([("out/it's.mp4", 1.5)], "list.txt", durations=True)
+    expected = os.path.abspath("out/it's.mp4").replace("\\", "/").replace("'", "'\\''")
+    assert (tmp_path / "list.txt").read_text(encoding="utf-8") == \
+        f"file '{expected}'\nduration 1.500000\n"
+
+
+def test_job_paths_are_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    job = af.RenderJob("out", "20260101_000000", [], {})
+    assert os.path.isabs(job.work_dir) and os.path.isabs(job.output)
+
+
+@pytest.mark.parametrize("engine", [af.ENGINE_CLIPS, af.ENGINE_DIRECT])
+def test_custom_length_into_relative_folder(tmp_path, monkeypatch, folder, engine):
+    monkeypatch.chdir(tmp_path)
+    # Chunks of the direct engine are joined through a concat list too
+    monkeypatch.setattr(af, "DIRECT_CHUNK_SIZE", 2)
+    out = af.render_files(folder, "out", 1, lambda *_: None, minutes=0.1, engine=engine)
+    assert out == os.path.join(str(tmp_path), "out", os.path.basename(out))
+    # Trimmed last clip included, within a frame
+    assert abs(af.get_video_duration(out) - 6.0) < 0.1
+    jobs = tmp_path / "out" / af.JOBS_DIR
+    assert not jobs.exists() or not os.listdir(jobs)
+
+
+def test_metrics_stay_out_of_the_output_folder(tmp_path, monkeypatch, folder):
+    monkeypatch.setattr(af, "METRICS_DIR", str(tmp_path / "metrics"))
+    monkeypatch.setattr(af, "METRICS_KEEP", 2)
+    for name in ("metrics_20000101_000000_1.json", "metrics_20000101_000001_1.json"):
+        (tmp_path / "metrics").mkdir(exist_ok=True)
+        (tmp_path / "metrics" / name).write_text("{}")
+
+    out = af.render_files(folder, str(tmp_path / "out"), 1, lambda *_: None)
+    assert not [n for n in os.listdir(tmp_path / "out") if n.startswith("metrics_")]
+    names = sorted(os.listdir(tmp_path / "metrics"))
+    assert names[0] == "metrics_20000101_000001_1.json" and len(names) == 2
+    with open(tmp_path / "metrics" / names[1], encoding="utf-8") as f:
+        assert json.load(f)["output"] == out
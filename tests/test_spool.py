@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+
+from conftest import af
+
+
+def make_spool(tmp_path):
+    spool = str(tmp_path / "spool")
+    for kind in af.SPOOL_DIRS:
+        os.makedirs(af.spool_path(spool, kind))
+    return spool
+
+
+def add_task(spool, key, age=0):
+    path = af.spool_path(spool, "tasks", key)
+    af.write_json_atomic(path, {"path": key})
+    os.utime(path, (time.time() - age, time.time() - age))
+
+
+def expire(spool, key):
+    old = time.time() - af.SPOOL_LEASE_SECONDS - 1
+    os.utime(af.spool_path(spool, "leases", key), (old, old))
+
+
+def test_one_worker_holds_a_lease(tmp_path):
+    spool = make_spool(tmp_path)
+    assert af.claim_task(spool, "k", "w1")
+    assert not af.claim_task(spool, "k", "w2")
+    assert af.renew_lease(spool, "k", "w1")
+    assert not af.renew_lease(spool, "k", "w2")
+    af.release_lease(spool, "k", "w2")
+    assert af.lease_owner(spool, "k") == "w1"
+    af.release_lease(spool, "k", "w1")
+    assert af.claim_task(spool, "k", "w2")
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    spool = make_spool(tmp_path)
+    assert af.claim_task(spool, "k", "w1")
+    expire(spool, "k")
+    assert af.claim_task(spool, "k", "w2")
+    assert af.lease_owner(spool, "k") == "w2"
+    # The first worker notices on its next heartbeat
+    assert not af.renew_lease(spool, "k", "w1")
+
+
+def test_next_task_takes_the_oldest_free_task(tmp_path):
+    spool = make_spool(tmp_path)
+    add_task(spool, "old", age=30)
+    add_task(spool, "done", age=20)
+    add_task(spool, "new", age=10)
+    af.write_json_atomic(af.spool_path(spool, "done", "done"), {"error": "x"})
+
+    assert af.next_task(spool, "w1") == "old"
+    assert af.next_task(spool, "w2") == "new"
+    assert af.next_task(spool, "w3") is None
+    # A task that already has a result is dropped
+    assert not os.path.exists(af.spool_path(spool, "tasks", "done"))
+
+
+def run_worker(spool):
+    worker = threading.Thread(target=af.run_spool_worker, args=(spool, 1, 2), daemon=True)
+    worker.start()
+    return worker
+
+
+def test_relative_spool_and_failed_results_are_retried(tmp_path, monkeypatch, make_media):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("in")
+    files = [make_media(os.path.join("in", "a.mp4")), make_media(os.path.join("in", "b.jpg"))]
+    files = [os.path.abspath(f) for f in files]
+    spool = "spool"
+
+    # A failure left by an earlier render, e.g. a worker that could not read the file
+    key = af.clip_cache_key(files[0], 1)
+    os.makedirs(af.spool_path(spool, "done"))
+    af.write_json_atomic(af.spool_path(spool, "done", key), {"error": "not mounted", "worker": "w"})
+
+    worker = run_worker(spool)
+    errors = []
+    clips = af.spool_clips(files, spool, 1, lambda *_: None, errors)
+    worker.join()
+
+    assert not errors
+    assert len(clips) == 2 and all(os.path.isabs(clip) for clip, _ in clips)
+    assert "error" not in af.read_json(af.spool_path(spool, "done", key))
+
+    # Paths in the concat list must not depend on the folder of the list
+    out = af.render_files(files, "out", 1, lambda *_: None, spool=spool)
+    assert abs(af.get_video_duration(out) - 2.0) < 0.1